@@ -0,0 +1,99 @@
+# NOTE: in-process job queue for long CQ runs
+# NOTE: local stand-in for a broker -> queue.Queue + worker threads; jobs live in memory of the API process
+
+import os
+import sys
+import time
+import uuid
+import queue
+import threading
+
+sys.dont_write_bytecode = True
+
+
+class Job:
+
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = 'queued'
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def set_progress(self, done, total):
+        self.done, self.total = done, total
+
+    def summary(self):
+        return {
+            'id' : self.id,
+            'status' : self.status,
+            'progress' : {'done' : self.done, 'total' : self.total},
+            'error' : self.error,
+            'created' : self.created,
+            'started' : self.started,
+            'finished' : self.finished,
+        }
+
+
+class JobManager:
+    '''
+    Runs func(request, progress=callback) for submitted requests on a pool of worker threads.
+    Finished jobs are kept for ttl seconds (None -> forever).
+    '''
+
+    def __init__(self, func, workers=2, ttl=3600):
+        self.func = func
+        self.ttl = ttl
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+
+        self.workers = [threading.Thread(target=self.worker, daemon=True) for _ in range(max(1, workers))]
+        for thread in self.workers:
+            thread.start()
+
+    def submit(self, request):
+        job = Job(request)
+        with self.lock:
+            self.prune()
+            self.jobs[job.id] = job
+        self.queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id, None)
+
+    def prune(self):
+        if self.ttl is None:
+            return
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished is not None and now - job.finished > self.ttl]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def worker(self):
+        while True:
+            job = self.queue.get()
+            job.status = 'running'
+            job.started = time.time()
+            try:
+                result = self.func(job.request, progress=job.set_progress)
+                # NOTE: run_cq_pipeline reports some failures as a {'status': 'fail'} payload instead of raising
+                if isinstance(result, dict) and result.get('status') == 'fail':
+                    job.error = result.get('echo', 'Run failed.')
+                    job.status = 'failed'
+                else:
+                    job.result = result
+                    job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished = time.time()
+                self.queue.task_done()
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import json
 import dotenv
 
 dotenv.load_dotenv()
@@ -9,8 +10,10 @@ sys.dont_write_bytecode = True
 PATH = os.getenv('PROJECT_PATH')
 sys.path.append(PATH)
 
-from fastapi import FastAPI, HTTPException
-from pipeline import run_cq_pipeline
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pipeline import run_cq_pipeline, stream_cq_pipeline, table_errors
+from jobs import JobManager
 
 from typing import Dict, List, Optional
 from fastapi import FastAPI, HTTPException
@@ -44,11 +47,73 @@ class RunRequest(BaseModel):
 
 app = FastAPI()
 
-@app.post("/run")
-def run(req: RunRequest):
+# NOTE: background workers for /jobs (JOB_WORKERS env, default 2)
+jobs = JobManager(run_cq_pipeline, workers=int(os.getenv('JOB_WORKERS', 2)))
+
+
+# NOTE: content negotiation of /run (Accept header) -> columnar binary payloads
+MEDIA_TYPES = {
+    'application/vnd.apache.arrow.stream' : 'arrow',
+    'application/vnd.apache.parquet' : 'parquet',
+    'application/x-parquet' : 'parquet',
+}
+
+
+def negotiate_format(accept: Optional[str]):
+    for media_type in (accept or '').split(','):
+        media_type = media_type.split(';')[0].strip().lower()
+        if media_type in MEDIA_TYPES:
+            return media_type, MEDIA_TYPES[media_type]
+    return 'application/json', 'json'
+
+def validate_source(req: RunRequest):
     if req.source.lower() != "yahoo":
         raise HTTPException(
             status_code=400,
             detail=f"Bad source: {req.source} | supported sources: [Yahoo]",
         )
-    return run_cq_pipeline(req.model_dump())
+
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.post("/run")
+def run(req: RunRequest, accept: Optional[str] = Header(None)):
+    validate_source(req)
+    media_type, output_format = negotiate_format(accept)
+    if output_format == 'json':
+        return run_cq_pipeline(req.model_dump())
+
+    try:
+        payload = run_cq_pipeline(req.model_dump(), output_format=output_format)
+        errors = table_errors(payload, output_format)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Run failed at exception: {e}")
+    # NOTE: tickers that failed to fetch (also in the payload schema metadata, key 'cq_errors')
+    return Response(content=payload, media_type=media_type, headers={'X-CQ-Errors' : json.dumps(errors)})
+
+@app.post("/run/stream")
+def run_stream(req: RunRequest):
+    validate_source(req)
+    return StreamingResponse(stream_cq_pipeline(req.model_dump()), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+def submit_job(req: RunRequest):
+    validate_source(req)
+    return jobs.submit(req.model_dump()).summary()
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return get_job(job_id).summary()
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = get_job(job_id)
+    if job.status == 'failed':
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.error}")
+    if job.status != 'done':
+        raise HTTPException(status_code=409, detail=f"Job not finished: {job.status}")
+    return job.result
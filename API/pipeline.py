@@ -1,6 +1,7 @@
 # pipeline file
 import os
 import sys
+import json
 import dotenv
 
 dotenv.load_dotenv()
@@ -11,39 +12,80 @@ sys.path.append(PATH)
 from Backend.Scripts.ETL.source_etl import *
 from Backend.Scripts.ETL.data_source import *
 from Backend.Scripts.ETL.cqgram_etl import *
+from Backend.Scripts.ETL.price_cache import PriceCache
+from result_cache import ResultCache, canonical, data_fingerprint, request_key, resolved_range
 
 
-def run_cq_pipeline(request):
+# NOTE: shared price cache (PRICE_CACHE_PATH unset -> no cache, PRICE_CACHE_OFFLINE=1 -> cached data only)
+CACHE_PATH = os.getenv('PRICE_CACHE_PATH')
+PRICE_CACHE = PriceCache(CACHE_PATH, offline=os.getenv('PRICE_CACHE_OFFLINE') == '1') if CACHE_PATH else None
 
-    source_mapping = {
-        'Yahoo' : Yahoo,
-        'Polygon' : None,
-        'EODHD' : None
-    }
+# NOTE: memoized responses of identical requests over identical data (RESULT_CACHE_MB=0 -> disabled)
+RESULT_CACHE_MB = int(os.getenv('RESULT_CACHE_MB', 256))
+RESULT_CACHE = ResultCache(max_bytes=RESULT_CACHE_MB * 2**20) if RESULT_CACHE_MB > 0 else None
 
-    source = source_mapping[request['source']](request['content']['tickers'])
+
+SOURCE_MAPPING = {
+    'Yahoo' : Yahoo,
+    'Polygon' : None,
+    'EODHD' : None
+}
+
+
+def fetch_source_data(request):
+    source = SOURCE_MAPPING[request['source']](request['content']['tickers'], cache=PRICE_CACHE)
     data = source.fetch_adjusted_data(**request['content']['source_params'])
+    return source, data
+
+
+def run_cq_pipeline(request, progress=None, output_format='json'):
+    '''output_format: 'json' -> response dict, 'arrow' / 'parquet' -> flat result table as bytes'''
+
+    # NOTE: memoization -> skipped when the run has to write files
+    output_params = request["content"].get("output_params", {})
+    memoize = RESULT_CACHE is not None and not output_params.get('save_file', False)
+    if memoize:
+        # NOTE: request-only key first -> a repeated request is answered without fetching any prices
+        alias = request_key(request, canonical(resolved_range(request['content'].get('source_params'))) + output_format)
+        cached = RESULT_CACHE.get(alias)
+        if cached is not None:
+            return cached
+
+    source, data = fetch_source_data(request)
+
+    if memoize:
+        # NOTE: same prices under another request / day -> data-keyed entry
+        key = request_key(request, data_fingerprint(data) + output_format)
+        cached = RESULT_CACHE.get(key)
+        if cached is not None:
+            RESULT_CACHE.alias(alias, key)
+            return cached
     
     # NOTE: CQ pipeline
 
     cqgram = CQGramPipeline()
     cqgram.load_data(data)
 
-    result = cqgram.compute_CQBS(**request['content']['cqgram_params'])
+    result = cqgram.compute_CQBS(**request['content']['cqgram_params'], progress=progress)
 
     # file writting
 
-    output_params = request["content"].get("output_params", {})
-
     if output_params.pop('save_file', False):
         cqgram.save_results(**output_params)
 
     # ---
 
+    if output_format != 'json':
+        response = serialise_table(result, output_format, errors=source.errors)
+        if memoize:
+            RESULT_CACHE.put(key, response, alias=alias)
+        return response
+
     try:
         response = {
             'status' : 'ok',
             'echo' : 'Run succesful.',
+            'errors' : source.errors,
             'result' : serialise_result(result)
         }
     except Exception as e:
@@ -52,12 +94,109 @@ def run_cq_pipeline(request):
             'echo' : f'Run failed at exception: {e}'
         }
 
+    if memoize and response['status'] == 'ok':
+        RESULT_CACHE.put(key, response, alias=alias)
+
     return response
 
 
+def stream_cq_pipeline(request):
+    '''
+    NDJSON variant of run_cq_pipeline: one line per (benchmark, candidate, tau2, tau1) key, emitted as soon
+    as its pair is computed. Lines: {"type": "meta"} -> {"type": "result"}* -> {"type": "end"} (or {"type": "error"}).
+    '''
+    try:
+        source, data = fetch_source_data(request)
+
+        cqgram = CQGramPipeline()
+        cqgram.load_data(data)
+
+        cqgram_params = request['content']['cqgram_params']
+        tasks = cqgram.pair_tasks(**cqgram_params)
+        yield ndjson_line({'type' : 'meta', 'pairs' : len(tasks), 'errors' : source.errors})
+
+        output_params = request["content"].get("output_params", {})
+        save_file = output_params.pop('save_file', False)
+        output = CQResultStore() if save_file else None
+
+        for result in cqgram.iter_CQBS(tasks=tasks, **cqgram_params):
+            for entry in serialise_entries(result):
+                yield ndjson_line({'type' : 'result', **entry})
+            if output is not None:
+                output |= result
+
+        if output is not None:
+            cqgram.current_output = output
+            cqgram.save_results(**output_params)
+
+        yield ndjson_line({'type' : 'end', 'status' : 'ok'})
+
+    except Exception as e:
+        yield ndjson_line({'type' : 'error', 'status' : 'fail', 'echo' : f'Run failed at exception: {e}'})
+
+
 # Helper
 
+# NOTE: source.errors of binary payloads -> JSON under this key of the Arrow / Parquet schema metadata
+ERRORS_METADATA = b'cq_errors'
+
+def serialise_table(result, output_format: str, errors=None) -> bytes:
+    '''Flat result table (create_dataframe_from_cqgram layout) as Arrow IPC stream or Parquet.'''
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if isinstance(result, CQResultStore):
+        table = result.to_arrow()
+    else:
+        table = pa.Table.from_pandas(CQGramPipeline.create_dataframe_from_cqgram(result), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), ERRORS_METADATA : json.dumps(errors or {}).encode()})
+
+    sink = pa.BufferOutputStream()
+    if output_format == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif output_format == 'parquet':
+        pq.write_table(table, sink, compression='zstd')
+    else:
+        raise ValueError(f'Unsupported output format: {output_format}')
+
+    return sink.getvalue().to_pybytes()
+
+def table_errors(payload: bytes, output_format: str) -> dict:
+    '''source.errors stored by serialise_table (schema only -> the table itself is not decoded).'''
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if output_format == 'arrow':
+        schema = pa.ipc.open_stream(payload).schema
+    else:
+        schema = pq.read_schema(pa.BufferReader(payload))
+    return json.loads((schema.metadata or {}).get(ERRORS_METADATA, b'{}'))
+
+def ndjson_line(record: dict) -> str:
+    return json.dumps(record, default=str) + '\n'
+
+def serialise_entry(key, value) -> dict:
+    key_str = "|".join(map(str, key))
+    if isinstance(value, str):
+        return {'key' : key_str, 'message' : value}
+    return {'key' : key_str, 'rows' : value.astype(object).where(value.notna(), None).to_dict("records")}
+
+def serialise_entries(result):
+    '''serialise_entry of every key; a CQResultStore is converted once (records) instead of one DataFrame per key.'''
+    if not isinstance(result, CQResultStore):
+        for key, value in result.items():
+            yield serialise_entry(key, value)
+        return
+
+    for key, rows in result.records(missing=None):
+        key_str = "|".join(map(str, key))
+        yield {'key' : key_str, 'message' : rows} if isinstance(rows, str) else {'key' : key_str, 'rows' : rows}
+
 def serialise_result(result: dict) -> dict:
+    if isinstance(result, CQResultStore):
+        return {"|".join(map(str, key)): rows for key, rows in result.records()}
+
     serialised = {}
     for key, value in result.items():
         key_str = "|".join(map(str, key))           
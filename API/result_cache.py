@@ -0,0 +1,118 @@
+# NOTE: content-addressed cache of /run responses
+# NOTE: key = sha256(canonical request parts + fingerprint of the fetched prices), LRU eviction under a byte budget
+# NOTE: request-only aliases (request + resolved date range) -> repeated requests are served before any fetch
+
+import os
+import sys
+import json
+import pickle
+import hashlib
+import datetime
+import threading
+
+sys.dont_write_bytecode = True
+
+from collections import OrderedDict
+
+import pandas as pd
+
+
+KEY_FIELDS = ('source_params', 'cqgram_params', 'tickers')
+
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+
+def data_fingerprint(data):
+    '''Data version of the fetched prices (row-wise pandas hash -> sha256).'''
+    if data is None or len(data) == 0:
+        return 'empty'
+    hashed = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes() + canonical(list(map(str, data.columns))).encode()).hexdigest()
+
+def resolved_range(source_params, today=None):
+    '''
+    Date range a request resolves to on a given day: open / future end -> today.
+    The day is part of the range -> a request-only key expires daily (Adj Close is revised retroactively).
+    '''
+    params = source_params or {}
+    today = today or datetime.date.today().isoformat()
+    end = params.get('end', None)
+    return {
+        'start' : params.get('start', None),
+        'end' : today if end is None else min(str(end), today),
+        'period' : params.get('period', 'max'),
+        'as_of' : today,
+    }
+
+def request_key(request, fingerprint):
+    content = request['content']
+    parts = {'source' : request['source'], **{field: content.get(field, None) for field in KEY_FIELDS}}
+    return hashlib.sha256((canonical(parts) + fingerprint).encode()).hexdigest()
+
+
+class ResultCache:
+    '''
+    Thread-safe LRU of responses.
+    Entries are kept serialised (bytes as is, anything else pickled) -> size = payload length and get returns a fresh copy.
+    '''
+
+    def __init__(self, max_bytes=256 * 2**20, max_entries=128):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.aliases = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            key = self.aliases.get(key, key)
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            payload, _, pickled = self.entries[key]
+
+        return pickle.loads(payload) if pickled else payload
+
+    def put(self, key, value, alias=None):
+        pickled = not isinstance(value, bytes)
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) if pickled else value
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (payload, size, pickled)
+            self.bytes += size
+            if alias is not None:
+                self.aliases[alias] = key
+
+            evicted = False
+            while self.bytes > self.max_bytes or len(self.entries) > self.max_entries:
+                _, (_, size, _) = self.entries.popitem(last=False)
+                self.bytes -= size
+                evicted = True
+            if evicted:
+                self.aliases = {alias: target for alias, target in self.aliases.items() if target in self.entries}
+
+    def alias(self, alias, key):
+        '''Second key for an existing entry (no copy of the payload).'''
+        with self.lock:
+            if key in self.entries:
+                self.aliases[alias] = key
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.aliases.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {'entries' : len(self.entries), 'aliases' : len(self.aliases), 'bytes' : self.bytes, 'hits' : self.hits, 'misses' : self.misses}
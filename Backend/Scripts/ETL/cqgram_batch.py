@@ -0,0 +1,138 @@
+# NOTE: Crisis batch runner
+# NOTE: all (period, phase) windows of period_mapping in one job -> one fetch, one return panel, one bootstrap plan, one pool
+
+import sys
+import datetime
+
+sys.dont_write_bytecode = True
+
+import numpy as np
+import pandas as pd
+
+try:
+    from cqgram_etl import CQGramPipeline
+    from cqgram_engine import BootstrapPlan
+    from cqgram_store import CQResultStore
+    from cqgram_storage import write_partitioned
+except ModuleNotFoundError:
+    from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+    from Backend.Scripts.ETL.cqgram_engine import BootstrapPlan
+    from Backend.Scripts.ETL.cqgram_store import CQResultStore
+    from Backend.Scripts.ETL.cqgram_storage import write_partitioned
+
+
+class CrisisBatchRunner:
+    '''
+    Computes CQBS for every (period, phase) window of period_mapping in one scheduled job.
+
+        - prices: fetched once over the union of all windows (+ buffer_days of history), returns computed once
+          -> window boundaries use the preceding close instead of dropping the first observation
+        - alignment: one return panel, every window is a row slice of it
+        - bootstrap: one BootstrapPlan shared by all windows & pairs (resample indices cached per sample length)
+        - scheduling: pair tasks of all windows go through one iter_CQBS call (one process pool with executor='process')
+        - output: one store per window; optionally written to a single Parquet dataset partitioned by period / phase / tau1
+    '''
+
+    def __init__(self, asset_mapping, period_mapping, source=None, config=None, buffer_days=10):
+        self.asset_mapping = asset_mapping
+        self.period_mapping = period_mapping
+        self.source = source
+        self.config = {} if config is None else config
+        self.buffer_days = buffer_days
+
+        self.pipeline = CQGramPipeline(self.config)
+        self.results = {}
+
+
+    def windows(self):
+        return [(period, phase, start, end) for period, phases in self.period_mapping.items() for phase, (start, end) in phases.items()]
+
+    def history_range(self):
+        windows = self.windows()
+        start = min(pd.Timestamp(start) for _, _, start, _ in windows) - datetime.timedelta(days=self.buffer_days)
+        end = max(pd.Timestamp(end) for _, _, _, end in windows)
+        return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+    def load(self, data=None):
+        '''Loads the price history (fetch_adjusted_data layout); fetched from the source when data is None.'''
+        if data is None:
+            if self.source is None:
+                try:
+                    from source_etl import Yahoo
+                except ModuleNotFoundError:
+                    from Backend.Scripts.ETL.source_etl import Yahoo
+                self.source = Yahoo(self.asset_mapping)
+
+            start, end = self.history_range()
+            data = self.source.fetch_adjusted_data(start=start, end=end)
+
+        self.pipeline.load_data(data)
+        return self
+
+
+    def run(self, output_dir=None, **kwargs):
+        '''
+        kwargs: compute_CQBS parameters (tau1_list, tau2_list, max_lag, n, seed, block_length, executor, workers, verbose, min_obs)
+            - progress: callable(done, total) over the pair tasks of all windows
+        output_dir: Parquet dataset root (each window replaces its own partitions)
+        '''
+        if self.pipeline.panel is None:
+            self.load()
+
+        progress = kwargs.pop('progress', None)
+
+        if kwargs.get('bootstrap_plan', None) is None:
+            kwargs['bootstrap_plan'] = BootstrapPlan(n=kwargs.get('n', 1000),
+                                                     block_length=kwargs.get('block_length', None),
+                                                     seed=kwargs.get('seed', self.config.get('seed', None)))
+
+        windows = self.windows()
+        tasks, owners = [], []
+        for w, (period, phase, start, end) in enumerate(windows):
+            window_tasks = self.pipeline.pair_tasks(start=start, end=end, **kwargs)
+            tasks.extend(window_tasks)
+            owners.extend([w] * len(window_tasks))
+
+        remaining = np.bincount(owners, minlength=len(windows))
+        stores = [CQResultStore() for _ in windows]
+
+        self.results = {}
+        for owner in np.flatnonzero(remaining == 0):
+            period, phase, _, _ = windows[owner]
+            self.results[(period, phase)] = stores[owner]
+
+        for done, (owner, result) in enumerate(zip(owners, self.pipeline.iter_CQBS(tasks=tasks, **kwargs)), start=1):
+            stores[owner] |= result
+            remaining[owner] -= 1
+
+            # NOTE: window finished -> stored / written while the rest is still being computed
+            if remaining[owner] == 0:
+                period, phase, _, _ = windows[owner]
+                self.results[(period, phase)] = stores[owner]
+                if output_dir is not None:
+                    write_partitioned(stores[owner], output_dir, period=period, phase=phase)
+                stores[owner] = None
+
+            if progress is not None:
+                progress(done, len(tasks))
+
+        return self.results
+
+
+    def to_pandas(self):
+        '''Flat table of all windows with period / phase columns.'''
+        frames = []
+        for (period, phase), store in self.results.items():
+            frame = store.to_pandas(categorical=False)
+            frame['period'] = period
+            frame['phase'] = phase
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame()
+
+        data = pd.concat(frames, ignore_index=True)
+        for column in ['period', 'phase', 'index', 'asset', 'date_start', 'date_end']:
+            data[column] = data[column].astype('category')
+        return data
@@ -0,0 +1,414 @@
+# NOTE: Native batched Cross-Quantilogram engine
+# NOTE: computes CQ statistics for the whole (tau1, tau2) grid in one pass
+
+import os
+import sys
+import bisect
+from collections import OrderedDict
+
+sys.dont_write_bytecode = True
+
+import numpy as np
+import pandas as pd
+
+
+CQBS_COLUMNS = ['cq', 'cq_upper', 'cq_lower', 'q', 'qc']
+
+
+# Quantile hits
+
+def quantile_hits(X, tau_list):
+    '''Centred quantile-hit indicators psi = 1{x < q(tau)} - tau.
+        X: (B, T) array of B series -> (B, n_tau, T)
+    '''
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    taus = np.asarray(tau_list, dtype=float)
+
+    quantiles = np.moveaxis(np.quantile(X, taus, axis=-1), 0, -1)         # (B, n_tau)
+    hits = X[:, None, :] < quantiles[:, :, None]
+
+    return hits - taus[None, :, None]
+
+
+# Statistics
+
+def cross_quantilogram(psi1, psi2, max_lag=1):
+    '''Cross-Quantilogram of psi1 against lagged psi2 for lags 1..max_lag.
+        psi1: (B, n1, T), psi2: (B, n2, T) -> (B, n1, n2, max_lag)
+    '''
+    B, n1, T = psi1.shape
+    n2 = psi2.shape[1]
+
+    cq = np.empty((B, n1, n2, max_lag))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k in range(1, max_lag + 1):
+            a = psi1[:, :, k:]
+            b = psi2[:, :, :-k]
+
+            numerator = a @ b.transpose(0, 2, 1)
+            norm_a = np.sqrt(np.einsum('bit,bit->bi', a, a))
+            norm_b = np.sqrt(np.einsum('bjt,bjt->bj', b, b))
+
+            cq[..., k - 1] = numerator / (norm_a[:, :, None] * norm_b[:, None, :])
+
+    return cq
+
+
+def portmanteau(cq, T):
+    '''Ljung-Box type Q statistic, cumulative over lags 1..p (last axis).'''
+    lags = np.arange(1, cq.shape[-1] + 1)
+    return T * (T + 2) * np.cumsum(cq ** 2 / (T - lags), axis=-1)
+
+
+# Bootstrap
+
+def default_block_length(T):
+    return max(1, int(round(T ** (1 / 3))))
+
+
+def stationary_bootstrap_indices(T, n, block_length=None, rng=None):
+    '''Stationary bootstrap (Politis & Romano, 1994) resample indices -> (n, T).
+        Blocks have geometric length with mean block_length and wrap around circularly.
+    '''
+    if block_length is None:
+        block_length = default_block_length(T)
+    if rng is None:
+        rng = np.random.default_rng()
+
+    starts = rng.integers(0, T, size=(n, T))
+    new_block = rng.random((n, T)) < 1.0 / block_length
+    new_block[:, 0] = True
+
+    positions = np.arange(T)
+    block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+    offsets = positions[None, :] - block_start
+
+    return (np.take_along_axis(starts, block_start, axis=1) + offsets) % T
+
+
+class BootstrapPlan:
+    '''Seeded stationary bootstrap shared across pairs and quantiles.
+        Resample indices are drawn once per (series length, n, block length) and reused by every
+        batched_CQBS call with the same length. Indices depend only on (seed, length), so plans
+        shipped to worker processes regenerate identical resamples.
+        The index cache is an LRU of max_entries lengths (n x T int32 each) -> bounded memory when many
+        distinct lengths occur (pairwise-complete alignment, many windows); evicted lengths are regenerated identically.
+    '''
+
+    def __init__(self, n=1000, block_length=None, seed=None, max_entries=8):
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+
+        self.n = n
+        self.block_length = block_length
+        self.seed = seed
+        self.max_entries = max_entries
+
+        self.cache = OrderedDict()
+
+    @property
+    def key(self):
+        return (self.seed, self.n, self.block_length)
+
+    def indices(self, T):
+        block_length = self.block_length if self.block_length is not None else default_block_length(T)
+
+        key = (T, block_length)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(T,)))
+        indices = stationary_bootstrap_indices(T, self.n, block_length=block_length, rng=rng).astype(np.int32)
+
+        self.cache[key] = indices
+        while len(self.cache) > max(1, self.max_entries):
+            self.cache.popitem(last=False)
+
+        return indices
+
+    def __getstate__(self):
+        # NOTE: index matrices are not pickled -> cheap to ship, regenerated on demand
+        state = self.__dict__.copy()
+        state['cache'] = OrderedDict()
+        return state
+
+
+# Main
+
+def batched_CQBS(x1, tau1_list, x2, tau2_list, k=1, cqcl=0.95, testcl=0.95, n=1000,
+                 block_length=None, rng=None, batch_size=250, bootstrap_plan=None):
+    '''Cross-Quantilogram with stationary bootstrap for every (tau1, tau2) combination at once.
+        x2 is the lagged series (same convention as CrossQuantilogram.CQBS).
+        bootstrap_plan (BootstrapPlan) overrides n, block_length & rng with shared resamples.
+        Returns dict {column: (n_tau1, n_tau2, k) array} for CQBS_COLUMNS.
+    '''
+    x1 = np.asarray(x1, dtype=float)
+    x2 = np.asarray(x2, dtype=float)
+
+    if x1.shape != x2.shape:
+        raise ValueError(f'Series lengths differ: {x1.shape} != {x2.shape}')
+
+    T = len(x1)
+
+    cq = cross_quantilogram(quantile_hits(x1, tau1_list), quantile_hits(x2, tau2_list), k)[0]
+    q = portmanteau(cq, T)
+
+    if bootstrap_plan is not None:
+        indices = bootstrap_plan.indices(T)
+    else:
+        indices = stationary_bootstrap_indices(T, n, block_length=block_length, rng=rng)
+
+    return {'cq' : cq, 'q' : q} | bootstrap_statistics(x1, tau1_list, x2, tau2_list, cq, indices,
+                                                    cqcl=cqcl, testcl=testcl, batch_size=batch_size)
+
+
+def bootstrap_statistics(x1, tau1_list, x2, tau2_list, cq, indices, cqcl=0.95, testcl=0.95, batch_size=250):
+    '''Bootstrap confidence band & Q critical value for sample cq (n_tau1, n_tau2, k) from (n, T) resample indices.'''
+    n, T = indices.shape
+    k = cq.shape[-1]
+
+    cq_bs = np.empty((n,) + cq.shape)
+    for i in range(0, n, batch_size):
+        batch = indices[i:i + batch_size]
+        cq_bs[i:i + batch_size] = cross_quantilogram(
+            quantile_hits(x1[batch], tau1_list),
+            quantile_hits(x2[batch], tau2_list),
+            k
+        )
+
+    # NOTE: bootstrap distribution is centred on the sample estimate (null band around 0)
+    deviation = cq_bs - cq[None]
+
+    return {
+        'cq_upper' : np.nanquantile(deviation, (1 + cqcl) / 2, axis=0),
+        'cq_lower' : np.nanquantile(deviation, (1 - cqcl) / 2, axis=0),
+        'qc' : np.nanquantile(portmanteau(deviation, T), testcl, axis=0),
+    }
+
+
+def frame_CQBS(grid, i, j):
+    '''Single (tau1, tau2) slice of batched_CQBS output in CQBS DataFrame layout (index = lag).'''
+    k = grid['cq'].shape[-1]
+    return pd.DataFrame(
+        {column: grid[column][i, j] for column in CQBS_COLUMNS},
+        index=range(1, k + 1)
+    )
+
+
+def postprocess_CQBS(grid, max_lag, normalize_significance=True):
+    '''Fused post-processing over a whole batched result (any shape, last axis = lag):
+        H0 rejection (|q| > qc), significance masking of cq and lag metadata -> flat column dict.
+    '''
+    shape = grid['cq'].shape
+
+    columns = {column: np.ravel(grid[column]) for column in CQBS_COLUMNS}
+    columns['H0_rejected'] = np.abs(columns['q']) > columns['qc']
+
+    if normalize_significance:
+        columns['cq'] = np.where(columns['H0_rejected'], columns['cq'], 0.0)
+
+    columns['lag'] = np.broadcast_to(np.arange(1, shape[-1] + 1), shape).ravel()
+    columns['max_lag'] = max_lag
+
+    return columns
+
+
+# Rolling window
+
+def sorted_quantile(values, tau):
+    '''Linear-interpolated quantile of an already sorted list (same rule as np.quantile).'''
+    h = (len(values) - 1) * tau
+    f = int(np.floor(h))
+    gamma = h - f
+
+    a = values[f]
+    b = values[min(f + 1, len(values) - 1)]
+    diff = b - a
+
+    return a + diff * gamma if gamma < 0.5 else b - diff * (1 - gamma)
+
+
+class RollingCrossQuantilogram:
+    '''Sliding-window Cross-Quantilogram of x1 against lagged x2 with incremental updates.
+        Keeps a sorted window per series, the hit flags of every window observation and the
+        cross products C[i, j, k] = sum_t h1_i(t) h2_j(t - k). A one-step slide only touches the
+        leaving/entering observation and the few hits flipped by the moved quantiles.
+    '''
+
+    def __init__(self, x1, tau1_list, x2, tau2_list, window, max_lag=1):
+        self.x1 = np.asarray(x1, dtype=float)
+        self.x2 = np.asarray(x2, dtype=float)
+
+        if self.x1.shape != self.x2.shape:
+            raise ValueError(f'Series lengths differ: {self.x1.shape} != {self.x2.shape}')
+        if not max_lag < window <= len(self.x1):
+            raise ValueError(f'Window {window} must satisfy max_lag < window <= series length ({len(self.x1)})')
+
+        self.tau1 = np.asarray(tau1_list, dtype=float)
+        self.tau2 = np.asarray(tau2_list, dtype=float)
+
+        self.window = window
+        self.lags = np.arange(1, max_lag + 1)
+        self.start = 0
+
+        # hit flags over absolute positions (only the current window is kept up to date)
+        self.h1 = np.zeros((len(self.tau1), len(self.x1)))
+        self.h2 = np.zeros((len(self.tau2), len(self.x2)))
+
+        self.sorted1 = self.init_sorted(self.x1)
+        self.sorted2 = self.init_sorted(self.x2)
+
+        self.q1 = np.array([sorted_quantile(self.sorted1[0], tau) for tau in self.tau1])
+        self.q2 = np.array([sorted_quantile(self.sorted2[0], tau) for tau in self.tau2])
+
+        self.h1[:, :window] = self.x1[None, :window] < self.q1[:, None]
+        self.h2[:, :window] = self.x2[None, :window] < self.q2[:, None]
+
+        self.C = np.stack([
+            self.h1[:, k:window] @ self.h2[:, :window - k].T for k in self.lags
+        ], axis=-1)
+
+    def init_sorted(self, x):
+        order = np.argsort(x[:self.window], kind='stable')
+        return [list(x[order]), list(order)]
+
+    @staticmethod
+    def sorted_replace(sorted_pair, value_out, t_out, value_in, t_in):
+        values, positions = sorted_pair
+
+        i = bisect.bisect_left(values, value_out)
+        while positions[i] != t_out:
+            i += 1
+        del values[i], positions[i]
+
+        i = bisect.bisect_right(values, value_in)
+        values.insert(i, value_in)
+        positions.insert(i, t_in)
+
+    @staticmethod
+    def flipped(sorted_pair, flags, q_old, q_new, t_in):
+        '''(tau index, position, delta) of window observations whose hit flag changes with q_old -> q_new.'''
+        values, positions = sorted_pair
+        flips = []
+
+        for i, (lo, hi) in enumerate(zip(np.minimum(q_old, q_new), np.maximum(q_old, q_new))):
+            if lo == hi:
+                continue
+            for idx in range(bisect.bisect_left(values, lo), bisect.bisect_right(values, hi)):
+                t = positions[idx]
+                if t == t_in:
+                    continue
+                hit = float(values[idx] < q_new[i])
+                if hit != flags[i, t]:
+                    flips.append((i, t, hit - flags[i, t]))
+
+        return flips
+
+    def slide(self):
+        '''Moves the window one observation forward.'''
+        s, w, lags = self.start, self.window, self.lags
+        t_in = s + w
+
+        # 1) drop pair terms that reference the leaving observation
+        self.C -= self.h1[:, s + lags][:, None, :] * self.h2[:, s][None, :, None]
+
+        # 2) update sorted windows & quantiles
+        self.sorted_replace(self.sorted1, self.x1[s], s, self.x1[t_in], t_in)
+        self.sorted_replace(self.sorted2, self.x2[s], s, self.x2[t_in], t_in)
+
+        q1 = np.array([sorted_quantile(self.sorted1[0], tau) for tau in self.tau1])
+        q2 = np.array([sorted_quantile(self.sorted2[0], tau) for tau in self.tau2])
+
+        # 3) hit flips of observations staying in the window (pairs within [s + 1, t_in))
+        for i, t, delta in self.flipped(self.sorted1, self.h1, self.q1, q1, t_in):
+            valid = t - lags >= s + 1
+            self.C[i][:, valid] += delta * self.h2[:, t - lags[valid]]
+            self.h1[i, t] += delta
+
+        for j, t, delta in self.flipped(self.sorted2, self.h2, self.q2, q2, t_in):
+            valid = t + lags <= t_in - 1
+            self.C[:, j][:, valid] += delta * self.h1[:, t + lags[valid]]
+            self.h2[j, t] += delta
+
+        self.q1, self.q2 = q1, q2
+
+        # 4) entering observation
+        self.h1[:, t_in] = self.x1[t_in] < q1
+        self.h2[:, t_in] = self.x2[t_in] < q2
+
+        self.C += self.h1[:, t_in][:, None, None] * self.h2[:, t_in - lags][None, :, :]
+
+        self.start = s + 1
+
+    def cq(self):
+        '''Cross-Quantilogram of the current window -> (n_tau1, n_tau2, k).'''
+        s, w, lags = self.start, self.window, self.lags
+        k = len(lags)
+
+        h1 = self.h1[:, s:s + w]
+        h2 = self.h2[:, s:s + w]
+
+        # hits of x1 over t in [k, w) and of lagged x2 over t in [0, w - k), per lag
+        c1 = h1.sum(axis=1)[:, None] - np.cumsum(h1[:, :k], axis=1)
+        c2 = h2.sum(axis=1)[:, None] - np.cumsum(h2[:, ::-1][:, :k], axis=1)
+        m = w - lags
+
+        a1 = self.tau1[:, None]
+        a2 = self.tau2[:, None]
+
+        numerator = (self.C
+                     - a2[None, :, :] * c1[:, None, :]
+                     - a1[:, None, :] * c2[None, :, :]
+                     + m * a1[:, None, :] * a2[None, :, :])
+
+        var1 = c1 * (1 - a1) ** 2 + (m - c1) * a1 ** 2
+        var2 = c2 * (1 - a2) ** 2 + (m - c2) * a2 ** 2
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return numerator / np.sqrt(var1[:, None, :] * var2[None, :, :])
+
+
+def rolling_CQBS(x1, tau1_list, x2, tau2_list, window, max_lag=1, step=1, cqcl=0.95, testcl=0.95,
+                 bootstrap_plan=None, batch_size=250):
+    '''Rolling-window Cross-Quantilogram emitted every `step` observations into preallocated arrays.
+        Critical values:
+            - bootstrap_plan given: stationary bootstrap per emitted window (one index matrix for all windows)
+              -> O(n * window) per emitted window, the incremental O(1) update only covers cq / q
+            - otherwise: asymptotic chi-square(p) critical value of Q(p), confidence band left as NaN
+        Returns dict {'end': (n_windows,) window end positions, column: (n_windows, n_tau1, n_tau2, k)}.
+    '''
+    engine = RollingCrossQuantilogram(x1, tau1_list, x2, tau2_list, window, max_lag=max_lag)
+
+    step = max(1, int(step))
+    n_windows = (len(engine.x1) - window) // step + 1
+    shape = (n_windows, len(engine.tau1), len(engine.tau2), max_lag)
+
+    output = {column: np.full(shape, np.nan) for column in CQBS_COLUMNS}
+    output['end'] = np.empty(n_windows, dtype=np.int64)
+
+    if bootstrap_plan is None:
+        from scipy.stats import chi2
+        output['qc'][:] = chi2.ppf(testcl, engine.lags)
+    else:
+        indices = bootstrap_plan.indices(window)
+
+    for e in range(n_windows):
+        while engine.start < e * step:
+            engine.slide()
+
+        s = engine.start
+        cq = engine.cq()
+
+        output['cq'][e] = cq
+        output['q'][e] = portmanteau(cq, window)
+        output['end'][e] = s + window - 1
+
+        if bootstrap_plan is not None:
+            stats = bootstrap_statistics(engine.x1[s:s + window], tau1_list, engine.x2[s:s + window], tau2_list,
+                                         cq, indices, cqcl=cqcl, testcl=testcl, batch_size=batch_size)
+            for column, values in stats.items():
+                output[column][e] = values
+
+    return output
@@ -6,9 +6,17 @@ sys.dont_write_bytecode = True
 import requests
 import datetime
 import numpy as np
+import concurrent.futures
 import pandas as pd
-import CrossQuantilogram as cq
 
+try:
+    from cqgram_engine import BootstrapPlan, batched_CQBS, postprocess_CQBS
+    from cqgram_store import CQResultStore
+    from cqgram_storage import read_partitioned, read_sqlite, write_partitioned, write_sqlite
+except ModuleNotFoundError:
+    from Backend.Scripts.ETL.cqgram_engine import BootstrapPlan, batched_CQBS, postprocess_CQBS
+    from Backend.Scripts.ETL.cqgram_store import CQResultStore
+    from Backend.Scripts.ETL.cqgram_storage import read_partitioned, read_sqlite, write_partitioned, write_sqlite
 
 
 # Base
@@ -74,8 +82,16 @@ class CQGramPipeline(DataTransformer):
         self.include_benchmarks     = self.config.get('include_benchmarks', True)
         self.normalize_significance = self.config.get('normalize_significance', True)
 
+        # NOTE: 'batched' -> native grid engine, 'cq' -> CrossQuantilogram.CQBS per (tau1, tau2)
+        self.engine = self.config.get('engine', 'batched')
+
         self.data = {}
-        self.current_output = {}
+        self.current_output = CQResultStore()
+
+        self.panel = None
+        self.panel_values = None
+        self.panel_mask = None
+        self.panel_columns = {}
 
 
     def load_data(self, data):
@@ -89,12 +105,51 @@ class CQGramPipeline(DataTransformer):
             self.data['benchmarks'][group] = df_copy
             self.data['candidates'][group] = df_copy
 
+        self.build_panel()
+
+
+    def build_panel(self):
+        '''Wide calendar-date indexed float64 panel of log returns (one column per asset) + validity mask.
+            Built once -> pairs take column views instead of aligning copies per pair.
+        '''
+        series = {}
+        for group in ['benchmarks', 'candidates']:
+            for name, df in self.data.get(group, {}).items():
+                returns = df['log_return'].dropna()
+
+                # NOTE: same calendar-date alignment as align_series (exchange-local date)
+                dates = pd.DatetimeIndex(returns.index)
+                if dates.tz is not None:
+                    dates = dates.tz_localize(None)
+
+                returns = pd.Series(returns.to_numpy(dtype=np.float64), index=dates.normalize())
+                series[name] = returns[~returns.index.duplicated(keep='last')]
+
+        self.panel = pd.DataFrame(series, dtype=np.float64).sort_index()
+        self.panel_values = self.panel.to_numpy()
+        self.panel_mask = ~np.isnan(self.panel_values)
+        self.panel_columns = {name: i for i, name in enumerate(self.panel.columns)}
+
+
+    def aligned_pair(self, first, second, start=None, end=None):
+        '''Pairwise-complete return arrays of (first, second) from the panel within [start, end] + their dates.'''
+        if self.panel is None:
+            self.build_panel()
+
+        dates = self.panel.index
+        lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side='right')
+
+        i, j = self.panel_columns[first], self.panel_columns[second]
+        valid = self.panel_mask[lo:hi, i] & self.panel_mask[lo:hi, j]
+
+        return self.panel_values[lo:hi, i][valid], self.panel_values[lo:hi, j][valid], dates[lo:hi][valid]
+
     @staticmethod
     def Q_statistic_test(result):
         '''rules for q-statistic and H0 rejection -> no directional predictability'''
 
-        rule = result.apply(lambda row: abs(row['q']) > row['qc'], axis=1)
-        result['H0_rejected'] = rule
+        result['H0_rejected'] = result['q'].abs() > result['qc']
         return result
     
     @staticmethod
@@ -115,12 +170,27 @@ class CQGramPipeline(DataTransformer):
         return result
     
 
+    def postprocess(self, result, max_lag, start, end):
+        result = self.Q_statistic_test(result)
+
+        if self.normalize_significance:
+            result = self.set_significance(result)
+
+        result = self.add_lag_parameter(result, lag=max_lag)
+        result = self.add_timestamp(result, start=start, end=end)
+        return result
+
+
     def compute_pair_CQBS(self, X, tau1_list, Y, tau2_list, max_lag=1, **kwargs):
         '''Computes Cross-Quantilogram statistic between X, Y.
             kwargs:
                 - start: time-series alignment start
                 - end: time-series alignment end
                 - n: number of bootstrap iterations in cqgram
+                - bootstrap_plan: shared BootstrapPlan (batched engine only)
+            engine (config):
+                - 'batched': whole (tau1, tau2) grid in one pass (quantiles, hits & bootstrap shared)
+                - 'cq': CrossQuantilogram.CQBS per (tau1, tau2) combination
         '''
     
         benchmark = kwargs.get('benchmark', None)
@@ -142,71 +212,179 @@ class CQGramPipeline(DataTransformer):
                     (benchmark, candidate, None, None) : 'Stationary test not satisfied'
                 }
 
+        cqbs_kwargs = {key: kwargs[key] for key in ('n', 'bootstrap_plan') if key in kwargs}
+
+        return self.compute_aligned_pair_CQBS(X_aligned, tau1_list, Y_aligned, tau2_list, max_lag=max_lag,
+                                              benchmark=benchmark, candidate=candidate, verbose=verbose,
+                                              date_start=X_aligned.index[0], date_end=X_aligned.index[-1], **cqbs_kwargs)
+
+
+    def compute_aligned_pair_CQBS(self, X_aligned, tau1_list, Y_aligned, tau2_list, max_lag=1, **kwargs):
+        '''Computes Cross-Quantilogram statistic between already aligned X, Y (Series or arrays).
+            kwargs:
+                - date_start, date_end: alignment timestamps stamped on results
+                - n: number of bootstrap iterations in cqgram
+                - bootstrap_plan: shared BootstrapPlan (batched engine only)
+        '''
+
+        benchmark = kwargs.get('benchmark', None)
+        candidate = kwargs.get('candidate', None)
+
+        date_start = kwargs.get('date_start', None)
+        date_end   = kwargs.get('date_end', None)
+
+        verbose = kwargs.get('verbose', True)
+
+        cqbs_kwargs = {key: kwargs[key] for key in ('n',) if key in kwargs}
+
         output = {}
 
         # NOTE: order is switched in parent function -> implementation should be correct now [not a typo/bug]
 
-        for tau1 in tau1_list:
-            for tau2 in tau2_list:
+        if self.engine == 'batched':
+            grid = batched_CQBS(X_aligned, tau1_list, Y_aligned, tau2_list, k=max_lag,
+                                bootstrap_plan=kwargs.get('bootstrap_plan', None), **cqbs_kwargs)
+
+            result = postprocess_CQBS(grid, max_lag, normalize_significance=self.normalize_significance)
+            result['date_start'] = date_start
+            result['date_end'] = date_end
 
-                result = cq.CQBS(X_aligned, tau1, Y_aligned, tau2, k=max_lag, verbose=verbose)
-                result = self.Q_statistic_test(result)
+            # NOTE: local (tau1, tau2) are key[2], key[3] -> labelled (tau2, tau1) in the flat table
+            output = CQResultStore(capacity=len(result['cq']))
+            output.append_block(benchmark, candidate, tau1_list, tau2_list, result)
 
-                if self.normalize_significance:
-                    result = self.set_significance(result)
+            return output
 
-                result = self.add_lag_parameter(result, lag=max_lag)
-                result = self.add_timestamp(result, start=X_aligned.index[0], end=X_aligned.index[-1])
+        # NOTE: reference engine only -> the batched default runs without the CrossQuantilogram package
+        import CrossQuantilogram as cq
+
+        X_aligned = pd.Series(X_aligned)
+        Y_aligned = pd.Series(Y_aligned)
+
+        for tau1 in tau1_list:
+            for tau2 in tau2_list:
+
+                result = cq.CQBS(X_aligned, tau1, Y_aligned, tau2, k=max_lag, verbose=verbose, **cqbs_kwargs)
+                result = self.postprocess(result, max_lag, date_start, date_end)
 
                 output[(benchmark, candidate, tau1, tau2)] = result
 
         return output
 
 
+    def pair_schedule(self):
+        '''(benchmark, candidate, group) in computation order; every pair is computed once.'''
+        schedule = {}
+
+        for benchmark in self.data['benchmarks'].keys():
+            for candidate in self.data['candidates'].keys():
+                if benchmark != candidate:
+                    schedule.setdefault((benchmark, candidate), 'candidates')
+
+            if self.include_benchmarks:
+                for benchmark2 in self.data['benchmarks'].keys():
+                    if benchmark != benchmark2:
+                        schedule.setdefault((benchmark, benchmark2), 'benchmarks')
+
+        return [(benchmark, candidate, group) for (benchmark, candidate), group in schedule.items()]
+
+
     def compute_CQBS(self, **kwargs):
         '''
         WARNING: Percentage calculation of returns is calculated on provided period, instead of adjusting series subset fetch data correspondingly and then use.
         Computes Cross-Quantilogram statistic from provided data (expects stationary series data).
         kwargs passed to CQBS:
             - n : number of bootstrap iterations
+        bootstrap (batched engine):
+            - bootstrap_plan: BootstrapPlan reused across all pairs & quantiles (default: one plan per run)
+            - seed, block_length: parameters of the default plan (seed also read from config)
+        execution:
+            - executor: None (serial) or 'process' -> pairs sharded across a process pool
+            - workers: process pool size (default: os.cpu_count())
+            - progress: callable(done, total) invoked after every finished pair
+            - min_obs: minimum aligned observations of a pair (default 1 -> only empty pairs skipped)
         '''
+        progress = kwargs.get('progress', None)
+
+        output = CQResultStore()
 
+        tasks = self.pair_tasks(**kwargs)
+        for done, result in enumerate(self.iter_CQBS(tasks=tasks, **kwargs), start=1):
+            output |= result
+            if progress is not None:
+                progress(done, len(tasks))
+
+        self.current_output = output
+
+        return output
+
+    def pair_tasks(self, **kwargs):
+        '''Aligned per-pair work items of compute_CQBS (same kwargs).'''
         lag = kwargs.get('max_lag', 1)
         tau1_list = kwargs.get('tau1_list', [])
         tau2_list = kwargs.get('tau2_list', [])
-        verbose = kwargs.get('verbose', True)
 
         # sluzi na further time-period constraint -> subset ktori chceme pocitat
         start = kwargs.get('start', None)
         end   = kwargs.get('end', None)
 
-        output = {}
+        pair_kwargs = {key: kwargs[key] for key in ('n',) if key in kwargs}
 
-        for benchmark in self.data['benchmarks'].keys():
-            X = self.data['benchmarks'][benchmark]['log_return'].dropna()
+        bootstrap_plan = kwargs.get('bootstrap_plan', None)
+        if bootstrap_plan is None:
+            bootstrap_plan = BootstrapPlan(n=kwargs.get('n', 1000),
+                                           block_length=kwargs.get('block_length', None),
+                                           seed=kwargs.get('seed', self.config.get('seed', None)))
+        pair_kwargs['bootstrap_plan'] = bootstrap_plan
 
-            for candidate in self.data['candidates'].keys():
-                if benchmark != candidate:
-                    Y = self.data['candidates'][candidate]['log_return'].dropna()
-                    #output = output | self.compute_pair_CQBS(X, tau1_list, Y, tau2_list, max_lag=lag, benchmark=benchmark, candidate=candidate)                                               # NOTE: fix issue 1 (planning)
-                    output = output | self.compute_pair_CQBS(Y, tau2_list, X, tau1_list, max_lag=lag,
-                                                            benchmark=benchmark, candidate=candidate, verbose=verbose, start=start, end=end)                                                   # NOTE: requires switch (X,Y) -> (Y, X) (taus as well)
+        if self.panel is None:
+            self.build_panel()
 
-            if self.include_benchmarks:
-                for benchmark2 in self.data['benchmarks'].keys():
-                    if benchmark != benchmark2:
-                        Y = self.data['benchmarks'][benchmark2]['log_return'].dropna()
-                        #output = output | self.compute_pair_CQBS(X, tau1_list, Y, tau2_list, max_lag=lag, benchmark=benchmark, candidate=benchmark2)
-                        output = output | self.compute_pair_CQBS(Y, tau2_list, X, tau1_list, max_lag=lag,
-                                                                benchmark=benchmark, candidate=benchmark2, verbose=verbose, start=start, end=end)
+        # NOTE: pairs with fewer aligned observations are skipped (e.g. asset not trading in the window)
+        min_obs = max(1, kwargs.get('min_obs', 1))
 
-        self.current_output = output
+        # NOTE: requires switch (X,Y) -> (Y, X) (taus as well)
+        tasks = []
+        for benchmark, candidate, _ in self.pair_schedule():
+            Y_aligned, X_aligned, dates = self.aligned_pair(candidate, benchmark, start=start, end=end)
+            if len(dates) < min_obs:
+                continue
+            tasks.append((self.config, benchmark, candidate,
+                          Y_aligned, tau2_list, X_aligned, tau1_list, lag,
+                          dates[0].date(), dates[-1].date(), pair_kwargs))
 
-        return output
+        return tasks
+
+    def iter_CQBS(self, tasks=None, **kwargs):
+        '''Yields the result of every pair (CQResultStore / dict) as soon as it is computed, in schedule order.'''
+        if tasks is None:
+            tasks = self.pair_tasks(**kwargs)
+
+        verbose  = kwargs.get('verbose', True)
+        executor = kwargs.get('executor', None)
+        workers  = kwargs.get('workers', None)
+
+        if executor == 'process':
+            workers = workers or os.cpu_count() or 1
+            chunksize = max(1, len(tasks) // (4 * workers))
+
+            # NOTE: workers receive aligned arrays only; pool.map keeps task order -> identical to the serial run
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                yield from pool.map(compute_pair_task, tasks, chunksize=chunksize)
+            return
+
+        for config, benchmark, candidate, Y_aligned, tau2_list, X_aligned, tau1_list, lag, date_start, date_end, cqbs_kwargs in tasks:
+            #output = output | self.compute_pair_CQBS(X, tau1_list, Y, tau2_list, max_lag=lag, benchmark=benchmark, candidate=candidate)                                               # NOTE: fix issue 1 (planning)
+            yield self.compute_aligned_pair_CQBS(Y_aligned, tau2_list, X_aligned, tau1_list, max_lag=lag,
+                                                 benchmark=benchmark, candidate=candidate, verbose=verbose,
+                                                 date_start=date_start, date_end=date_end, **cqbs_kwargs)
 
 
     @classmethod
     def create_dataframe_from_cqgram(self, results):
+        if isinstance(results, CQResultStore):
+            return results.to_pandas()
+
         rows = []
         for key, df_row in results.items():
             
@@ -231,18 +409,86 @@ class CQGramPipeline(DataTransformer):
 
 
     def save_results(self, path=None, **kwargs):
+        '''
+        Writes current_output.
+            - output_format: 'csv' (single file) or 'parquet' (dataset partitioned by period / phase / tau1)
+            - period, phase: labels stamped on the rows (partition keys)
+            - partition_cols: overrides the default partitioning
+        '''
+        output_format = kwargs.pop('output_format', 'csv')
+        period = kwargs.pop('period', None)
+        phase  = kwargs.pop('phase', None)
+        partition_cols = kwargs.pop('partition_cols', None)
+
         if path is None:
-            file_dir = kwargs.pop('output_dir', './') if not None else './'
-            file = kwargs.pop('output_file', 'file.csv') if not None else 'file.csv'
-            path = file_dir + file
+            file_dir = kwargs.pop('output_dir', None) or './'
+            file = kwargs.pop('output_file', None) or ('file.csv' if output_format == 'csv' else 'cq_results')
+            path = os.path.join(file_dir, file)
+        else:
+            kwargs.pop('output_dir', None)
+            kwargs.pop('output_file', None)
+
+        if output_format == 'parquet':
+            write_partitioned(self.current_output, path, partition_cols=partition_cols, period=period, phase=phase)
+            return path
 
         df = self.create_dataframe_from_cqgram(self.current_output)
+        if period is not None:
+            df['period'] = period
+        if phase is not None:
+            df['phase'] = phase
         df.to_csv(path, **kwargs)
 
+        return path
+
+
+    def save_results_to_db(self, path='./cq_results.sqlite', table='cq_results', **kwargs):
+        '''Appends current_output to an embedded SQLite table (period / phase labels optional).'''
+        if isinstance(self.current_output, CQResultStore):
+            results = self.current_output
+        else:
+            results = self.create_dataframe_from_cqgram(self.current_output)
+
+        write_sqlite(results, path, table=table, if_exists=kwargs.get('if_exists', 'append'),
+                     period=kwargs.get('period', None), phase=kwargs.get('phase', None))
+
+        return path
+
+
+    @classmethod
+    def load_results(self, path, columns=None, **filters):
+        '''Reads saved results: partitioned Parquet directory, SQLite file (*.sqlite / *.db) or CSV; filters column=value(s).'''
+        if os.path.isdir(path):
+            return read_partitioned(path, columns=columns, **filters)
+        if path.endswith(('.sqlite', '.db')):
+            return read_sqlite(path, table=filters.pop('table', 'cq_results'), columns=columns, **filters)
+
+        df = pd.read_csv(path, usecols=columns)
+        for column, value in filters.items():
+            if value is not None:
+                df = df[df[column].isin(list(value) if isinstance(value, (list, tuple, set)) else [value])]
+        return df
+
+
+# Workers
+
+# NOTE: per-process registry -> a worker generates bootstrap indices once per plan & length
+BOOTSTRAP_PLANS = {}
+
+
+def compute_pair_task(task):
+    '''Process pool entry point: computes one aligned (benchmark, candidate) pair.'''
+    config, benchmark, candidate, X_aligned, tau1_list, Y_aligned, tau2_list, max_lag, date_start, date_end, cqbs_kwargs = task
+
+    if cqbs_kwargs.get('bootstrap_plan', None) is not None:
+        plan = cqbs_kwargs['bootstrap_plan']
+        cqbs_kwargs = cqbs_kwargs | {'bootstrap_plan' : BOOTSTRAP_PLANS.setdefault(plan.key, plan)}
 
-    def save_results_to_db(self, **kwargs):
-        # NOTE: TODO: database compatible implementation
-        pass
+    return CQGramPipeline(config).compute_aligned_pair_CQBS(
+        X_aligned, tau1_list, Y_aligned, tau2_list, max_lag=max_lag,
+        benchmark=benchmark, candidate=candidate, verbose=False,
+        date_start=date_start, date_end=date_end, **cqbs_kwargs
+    )
 
 
 # ---
@@ -0,0 +1,124 @@
+# NOTE: Storage backends for CQ results
+# NOTE: hive-partitioned Parquet dataset (period / phase / tau1) + embedded SQLite table
+
+import os
+import sys
+import sqlite3
+import contextlib
+
+sys.dont_write_bytecode = True
+
+import numpy as np
+import pandas as pd
+
+
+PARTITION_COLUMNS = ['period', 'phase', 'tau1']
+DICTIONARY_COLUMNS = ['index', 'asset', 'date_start', 'date_end', 'period', 'phase']
+INDEX_COLUMNS = ['period', 'phase', 'tau1', 'tau2', 'index', 'asset']
+
+# NOTE: hive discovery infers non-integer keys as strings -> known numeric partition keys are re-typed
+PARTITION_TYPES = {'tau1' : 'float64', 'tau2' : 'float64', 'lag' : 'int32', 'max_lag' : 'int32'}
+
+
+def to_table(results, **constants):
+    '''CQResultStore / flat DataFrame -> pyarrow.Table with dictionary-encoded labels; constants added as columns.'''
+    import pyarrow as pa
+
+    if hasattr(results, 'to_arrow'):
+        table = results.to_arrow()
+    else:
+        table = pa.Table.from_pandas(pd.DataFrame(results), preserve_index=False)
+
+    for column, value in constants.items():
+        if value is None:
+            continue
+        if column in table.column_names:
+            table = table.drop_columns([column])
+        table = table.append_column(column, pa.array(np.full(table.num_rows, value)))
+
+    for column in DICTIONARY_COLUMNS:
+        if column in table.column_names and not pa.types.is_dictionary(table.schema.field(column).type):
+            position = table.column_names.index(column)
+            table = table.set_column(position, column, table[column].cast(pa.string()).dictionary_encode())
+
+    return table
+
+
+def write_partitioned(results, root, partition_cols=None, **constants):
+    '''
+    Writes results as a hive-partitioned Parquet dataset (root/period=.../phase=.../tau1=.../part-0.parquet).
+    Partitions being written replace the existing ones; other partitions are kept.
+    '''
+    import pyarrow.dataset as ds
+
+    table = to_table(results, **constants)
+    partition_cols = [column for column in (partition_cols or PARTITION_COLUMNS) if column in table.column_names]
+
+    ds.write_dataset(
+        table, root, format='parquet',
+        partitioning=partition_cols or None, partitioning_flavor='hive' if partition_cols else None,
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet',
+    )
+
+def read_partitioned(root, columns=None, **filters):
+    '''
+    Reads a partitioned result dataset; filters column=value or column=[values] (partition keys are pruned,
+    other columns are pushed down to the Parquet reader).
+    '''
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    discovered = ds.dataset(root, format='parquet', partitioning='hive').partitioning.schema
+    schema = pa.schema([(name, PARTITION_TYPES.get(name, 'string')) for name in discovered.names])
+    dataset = ds.dataset(root, format='parquet', partitioning=ds.partitioning(schema, flavor='hive'))
+
+    expression = None
+    for column, value in filters.items():
+        if value is None:
+            continue
+        condition = ds.field(column).isin(list(value)) if isinstance(value, (list, tuple, set)) else ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+@contextlib.contextmanager
+def connect(path):
+    '''Connection for one transaction (committed / rolled back, then closed).'''
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def write_sqlite(results, path, table='cq_results', if_exists='append', **constants):
+    '''Appends results to an SQLite table (created with an index on the usual lookup columns).'''
+    frame = results.to_pandas(categorical=False) if hasattr(results, 'to_pandas') else pd.DataFrame(results)
+    for column, value in constants.items():
+        if value is not None:
+            frame[column] = value
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with connect(path) as conn:
+        frame.to_sql(table, conn, if_exists=if_exists, index=False, chunksize=50_000)
+        indexed = [f'"{column}"' for column in INDEX_COLUMNS if column in frame.columns]
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{table}_lookup" ON "{table}" ({", ".join(indexed)})')
+
+def read_sqlite(path, table='cq_results', columns=None, **filters):
+    selected = ', '.join(f'"{column}"' for column in columns) if columns else '*'
+    conditions, params = [], []
+    for column, value in filters.items():
+        if value is None:
+            continue
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        conditions.append(f'"{column}" IN ({", ".join("?" * len(values))})')
+        params.extend(values)
+    where = (' WHERE ' + ' AND '.join(conditions)) if conditions else ''
+
+    with connect(path) as conn:
+        return pd.read_sql_query(f'SELECT {selected} FROM "{table}"{where}', conn, params=params)
@@ -0,0 +1,266 @@
+# NOTE: Columnar CQ result store
+# NOTE: contiguous NumPy columns + categorical codes instead of one DataFrame per (benchmark, candidate, tau2, tau1)
+
+import os
+import sys
+
+sys.dont_write_bytecode = True
+
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+
+class CQResultStore(Mapping):
+    '''
+    Columnar container of Cross-Quantilogram results.
+
+    Rows are kept in contiguous arrays (cq, q, qc, lag, H0_rejected, ...), labels as integer codes into
+    shared category lists (assets, taus, dates). The store is also a read-only mapping
+    key -> per-key DataFrame, key = (index, asset, tau2, tau1) as labelled by create_dataframe_from_cqgram,
+    so existing dict-of-DataFrames consumers keep working.
+    '''
+
+    FLOAT_COLUMNS = ['cq', 'cq_upper', 'cq_lower', 'q', 'qc']
+    CODE_COLUMNS  = {'index' : 'asset', 'asset' : 'asset', 'tau2' : 'tau', 'tau1' : 'tau',
+                     'date_start' : 'date', 'date_end' : 'date'}
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.capacity = capacity
+
+        self.columns = {column: np.empty(capacity) for column in self.FLOAT_COLUMNS}
+        self.columns['H0_rejected'] = np.empty(capacity, dtype=bool)
+        self.columns['lag'] = np.empty(capacity, dtype=np.int32)
+        self.columns['max_lag'] = np.empty(capacity, dtype=np.int32)
+        self.columns['alive'] = np.empty(capacity, dtype=bool)
+        for column in self.CODE_COLUMNS:
+            self.columns[column] = np.empty(capacity, dtype=np.int32)
+
+        self.labels = {'asset' : [], 'tau' : [], 'date' : []}
+        self.lookup = {'asset' : {}, 'tau' : {}, 'date' : {}}
+
+        # key -> (start, stop) row range or message (e.g. failed stationarity test)
+        self.keys_map = {}
+        self.has_dead = False
+
+
+    # Mapping interface
+
+    def __getitem__(self, key):
+        entry = self.keys_map[key]
+        if isinstance(entry, str):
+            return entry
+
+        start, stop = entry
+        rows = slice(start, stop)
+
+        frame = pd.DataFrame({column: self.columns[column][rows] for column in self.FLOAT_COLUMNS})
+        frame['H0_rejected'] = self.columns['H0_rejected'][rows]
+        frame['lag'] = self.columns['lag'][rows]
+        frame['max_lag'] = self.columns['max_lag'][rows]
+        frame['date_start'] = self.decode('date_start', rows)
+        frame['date_end'] = self.decode('date_end', rows)
+        frame.index = frame['lag'].to_numpy()
+
+        return frame
+
+    def __iter__(self):
+        return iter(self.keys_map)
+
+    def __len__(self):
+        return len(self.keys_map)
+
+    def __or__(self, other):
+        merged = CQResultStore(capacity=max(1, self.size))
+        merged |= self
+        merged |= other
+        return merged
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
+    # Labels
+
+    def code(self, kind, value):
+        lookup = self.lookup[kind]
+        if value not in lookup:
+            lookup[value] = len(self.labels[kind])
+            self.labels[kind].append(value)
+        return lookup[value]
+
+    def decode(self, column, rows=slice(None)):
+        kind = self.CODE_COLUMNS[column]
+        codes = self.columns[column][:self.size][rows]
+        return np.asarray(self.labels[kind], dtype=float if kind == 'tau' else object)[codes]
+
+
+    # Appending
+
+    def reserve(self, n):
+        if self.size + n <= self.capacity:
+            return
+
+        capacity = max(2 * self.capacity, self.size + n)
+        for column, values in self.columns.items():
+            resized = np.empty(capacity, dtype=values.dtype)
+            resized[:self.size] = values[:self.size]
+            self.columns[column] = resized
+
+        self.capacity = capacity
+
+    def register(self, key, start, stop):
+        previous = self.keys_map.get(key, None)
+        if isinstance(previous, tuple):
+            self.columns['alive'][previous[0]:previous[1]] = False
+            self.has_dead = True
+
+        self.keys_map[key] = (start, stop)
+
+    def append_block(self, benchmark, candidate, tau2_list, tau1_list, columns):
+        '''Appends a (tau2 x tau1 x lag) block of one pair in C-order.
+            columns: cq, cq_upper, cq_lower, q, qc, H0_rejected, lag, max_lag (flat arrays or scalars),
+                     date_start, date_end (constant per pair -> scalar or first element)
+        '''
+        n2, n1 = len(tau2_list), len(tau1_list)
+        n = len(columns['cq'])
+        k = n // (n2 * n1) if n2 * n1 else 0
+
+        self.reserve(n)
+        rows = slice(self.size, self.size + n)
+
+        for column in self.FLOAT_COLUMNS + ['H0_rejected', 'lag', 'max_lag']:
+            self.columns[column][rows] = columns[column]
+        self.columns['alive'][rows] = True
+
+        self.columns['index'][rows] = self.code('asset', benchmark)
+        self.columns['asset'][rows] = self.code('asset', candidate)
+        for column in ['date_start', 'date_end']:
+            value = columns[column]
+            if np.ndim(value) > 0:
+                value = np.asarray(value)[0] if n else None
+            self.columns[column][rows] = self.code('date', str(value))
+
+        tau2_codes = np.array([self.code('tau', tau) for tau in tau2_list], dtype=np.int32)
+        tau1_codes = np.array([self.code('tau', tau) for tau in tau1_list], dtype=np.int32)
+        self.columns['tau2'][rows] = np.repeat(tau2_codes, n1 * k)
+        self.columns['tau1'][rows] = np.tile(np.repeat(tau1_codes, k), n2)
+
+        for i, tau2 in enumerate(tau2_list):
+            for j, tau1 in enumerate(tau1_list):
+                start = self.size + (i * n1 + j) * k
+                self.register((benchmark, candidate, tau2, tau1), start, start + k)
+
+        self.size += n
+
+    def append(self, key, value):
+        '''Appends a single legacy entry: per-key CQBS DataFrame or message string.'''
+        if isinstance(value, str):
+            self.keys_map[key] = value
+            return
+
+        self.append_block(key[0], key[1], [key[2]], [key[3]], value)
+
+    def update(self, other):
+        if not isinstance(other, CQResultStore):
+            for key, value in other.items():
+                self.append(key, value)
+            return
+
+        offset = self.size
+        self.reserve(other.size)
+        rows = slice(offset, offset + other.size)
+
+        for column, values in other.columns.items():
+            if column in self.CODE_COLUMNS:
+                kind = self.CODE_COLUMNS[column]
+                remap = np.array([self.code(kind, label) for label in other.labels[kind]], dtype=np.int32)
+                self.columns[column][rows] = remap[values[:other.size]] if len(remap) else values[:other.size]
+            else:
+                self.columns[column][rows] = values[:other.size]
+
+        self.size += other.size
+        self.has_dead = self.has_dead or other.has_dead
+
+        for key, entry in other.keys_map.items():
+            if isinstance(entry, str):
+                self.keys_map[key] = entry
+            else:
+                self.register(key, entry[0] + offset, entry[1] + offset)
+
+
+    # Conversion
+
+    def categorical(self, column):
+        kind = self.CODE_COLUMNS[column]
+        return pd.Categorical.from_codes(self.columns[column][:self.size], categories=pd.Index(self.labels[kind], dtype=object))
+
+    def to_pandas(self, categorical=True):
+        '''Flat result table (create_dataframe_from_cqgram layout); numeric columns are not copied.'''
+        n = self.size
+
+        data = {column: self.columns[column][:n] for column in self.FLOAT_COLUMNS + ['H0_rejected', 'lag', 'max_lag']}
+        for column in ['date_start', 'date_end', 'index', 'asset']:
+            data[column] = self.categorical(column) if categorical else self.decode(column)
+        data['tau2'] = self.decode('tau2')
+        data['tau1'] = self.decode('tau1')
+        data['stationarity_satisfied'] = np.ones(n, dtype=bool)
+
+        frame = pd.DataFrame(data, copy=False)
+
+        if self.has_dead:
+            frame = frame[self.columns['alive'][:n]].reset_index(drop=True)
+
+        return frame
+
+    def to_arrow(self):
+        '''Flat result table as pyarrow.Table (dictionary-encoded labels, numeric buffers shared).'''
+        import pyarrow as pa
+
+        n = self.size
+        alive = self.columns['alive'][:n] if self.has_dead else None
+        take = (lambda values: values[alive]) if alive is not None else (lambda values: values)
+
+        arrays = {column: pa.array(take(self.columns[column][:n])) for column in self.FLOAT_COLUMNS + ['H0_rejected', 'lag', 'max_lag']}
+        for column in ['date_start', 'date_end', 'index', 'asset']:
+            kind = self.CODE_COLUMNS[column]
+            arrays[column] = pa.DictionaryArray.from_arrays(
+                pa.array(take(self.columns[column][:n])),
+                pa.array(self.labels[kind], type=pa.string())
+            )
+        arrays['tau2'] = pa.array(take(self.decode('tau2')))
+        arrays['tau1'] = pa.array(take(self.decode('tau1')))
+        arrays['stationarity_satisfied'] = pa.array(np.ones(len(arrays['cq']), dtype=bool))
+
+        return pa.table(arrays)
+
+
+    def records(self, missing=np.nan):
+        '''
+        (key, row dicts | message) per key in key order, as store[key].to_dict('records') would give them.
+        One flat conversion sliced by the key row ranges -> no per-key DataFrame.
+        missing: replacement of NaN values (None -> JSON null)
+        '''
+        n = self.size
+
+        frame = pd.DataFrame({column: self.columns[column][:n] for column in self.FLOAT_COLUMNS + ['H0_rejected', 'lag', 'max_lag']})
+        frame['date_start'] = self.decode('date_start')
+        frame['date_end'] = self.decode('date_end')
+        if missing is not np.nan:
+            frame = frame.astype(object).where(frame.notna(), missing)
+
+        rows = frame.to_dict('records')
+        for key, entry in self.keys_map.items():
+            yield key, entry if isinstance(entry, str) else rows[entry[0]:entry[1]]
+
+
+    # Pickling (process pool results)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['columns'] = {column: values[:self.size] for column, values in self.columns.items()}
+        state['capacity'] = self.size
+        return state
@@ -0,0 +1,240 @@
+# NOTE: Persistent on-disk price cache for data sources
+# NOTE: SQLite per cache file, keyed by (source, ticker, date); tracks fetched date ranges -> only gaps are requested
+# NOTE: gaps are fetched with an overlap into cached rows -> re-based 'Adj Close' of the new segment is rescaled to the cached one
+
+import os
+import sys
+import time
+import sqlite3
+import datetime
+import threading
+import contextlib
+
+sys.dont_write_bytecode = True
+
+import numpy as np
+import pandas as pd
+
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'Dividends', 'Stock Splits', 'Capital Gains']
+
+
+def to_date(value):
+    if isinstance(value, datetime.date):
+        return value if not isinstance(value, datetime.datetime) else value.date()
+    return datetime.datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def subtract_ranges(start, end, covered):
+    '''[start, end) minus the union of covered [a, b) ranges -> list of missing [a, b) ranges.'''
+    missing = []
+    cursor = start
+
+    for a, b in sorted(covered):
+        if b <= cursor:
+            continue
+        if a >= end:
+            break
+        if a > cursor:
+            missing.append((cursor, min(a, end)))
+        cursor = max(cursor, b)
+        if cursor >= end:
+            break
+
+    if cursor < end:
+        missing.append((cursor, end))
+
+    return missing
+
+
+class PriceCache:
+    '''
+    Local price cache shared by all sources.
+
+    Parameters:
+        - path: SQLite file
+        - ttl: seconds after which the recent tail of a fetched range is considered stale
+        - tail_days: size of the recent tail (days before the fetch date) refreshed after ttl
+        - offline: never call the source, serve only what is cached
+        - overlap_days: gaps are fetched this many days into the neighbouring cached rows (Adj Close rescaling)
+        - gap_days: non-trading days at the edges of a fetched range still counted as covered
+    '''
+
+    def __init__(self, path='Data/Cache/prices.sqlite', ttl=24 * 3600, tail_days=7, offline=False, overlap_days=7, gap_days=5):
+        self.path = path
+        self.ttl = ttl
+        self.tail_days = tail_days
+        self.offline = offline
+        self.overlap_days = overlap_days
+        self.gap_days = gap_days
+
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        columns = ', '.join(f'"{column}" REAL' for column in PRICE_COLUMNS)
+        with self.connect() as conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS prices (source TEXT, ticker TEXT, date TEXT, {columns}, '
+                         'PRIMARY KEY (source, ticker, date))')
+            conn.execute('CREATE TABLE IF NOT EXISTS coverage (source TEXT, ticker TEXT, start TEXT, end TEXT, fetched_at REAL)')
+
+
+    @contextlib.contextmanager
+    def connect(self):
+        '''Connection for one transaction (committed / rolled back, then closed).'''
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+    # Coverage
+
+    def covered_ranges(self, source, ticker, now=None):
+        '''Trusted [start, end) ranges; stale fetches only cover dates older than their tail.'''
+        if now is None:
+            now = time.time()
+
+        with self.connect() as conn:
+            rows = conn.execute('SELECT start, end, fetched_at FROM coverage WHERE source = ? AND ticker = ?',
+                                (source, ticker)).fetchall()
+
+        covered = []
+        for start, end, fetched_at in rows:
+            start, end = to_date(start), to_date(end)
+            if now - fetched_at > self.ttl:
+                fetched_date = datetime.date.fromtimestamp(fetched_at)
+                end = min(end, fetched_date - datetime.timedelta(days=self.tail_days))
+            if start < end:
+                covered.append((start, end))
+
+        return covered
+
+    def missing_ranges(self, source, ticker, start, end):
+        return subtract_ranges(to_date(start), to_date(end), self.covered_ranges(source, ticker))
+
+
+    # Read / write
+
+    @staticmethod
+    def frame_dates(frame):
+        dates = pd.DatetimeIndex(frame.index)
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+        return dates.normalize()
+
+    def covered_span(self, start, end, dates):
+        '''
+        Part of [start, end) backed by the fetched dates: up to gap_days of non-trading days at either edge
+        still count as covered, a missing head / tail beyond that does not (truncated response).
+        '''
+        start, end = to_date(start), to_date(end)
+        gap = datetime.timedelta(days=self.gap_days)
+
+        inside = [date for date in dates.date if start <= date < end]
+        if not inside:
+            return (start, end) if end - start <= gap else None
+
+        first, last = min(inside), max(inside) + datetime.timedelta(days=1)
+        span = (start if first - start <= gap else first, end if end - last <= gap else last)
+        return span if span[0] < span[1] else None
+
+    def rebase(self, source, ticker, frame, dates):
+        '''
+        Rescales 'Adj Close' of a fetched frame to the cached rows it overlaps (the source re-bases adjusted prices
+        on every download, e.g. after a dividend) -> no jumps in returns at the seams. Returns are unchanged.
+        '''
+        if 'Adj Close' not in frame.columns:
+            return frame
+
+        cached = self.read(source, ticker, dates.min(), dates.max() + pd.Timedelta(days=1))
+        if 'Adj Close' not in cached.columns or not len(cached):
+            return frame
+
+        new = pd.Series(frame['Adj Close'].to_numpy(dtype=float), index=dates)
+        ratio = (cached['Adj Close'] / new.reindex(cached.index)).dropna()
+        ratio = ratio[np.isfinite(ratio) & (ratio > 0)]
+        if not len(ratio):
+            return frame
+
+        frame = frame.copy()
+        frame['Adj Close'] = frame['Adj Close'] * float(ratio.median())
+        return frame
+
+    def store(self, source, ticker, start, end, frame):
+        '''
+        Writes fetched rows; coverage is recorded only for the span the rows actually back.
+        Empty / missing frames (throttling, transient errors) record nothing -> the range is fetched again next time.
+        '''
+        if frame is None or not len(frame):
+            return None
+
+        dates = self.frame_dates(frame)
+        frame = self.rebase(source, ticker, frame, dates)
+
+        values = frame.reindex(columns=PRICE_COLUMNS).astype(float)
+        values = values.astype(object).where(values.notna(), None).to_numpy()
+        rows = [(source, ticker, date, *row) for date, row in zip(dates.strftime('%Y-%m-%d'), values)]
+
+        span = self.covered_span(start, end, dates)
+
+        placeholders = ', '.join('?' * (3 + len(PRICE_COLUMNS)))
+        with self.lock, self.connect() as conn:
+            conn.executemany(f'INSERT OR REPLACE INTO prices VALUES ({placeholders})', rows)
+            if span is not None:
+                conn.execute('INSERT INTO coverage VALUES (?, ?, ?, ?, ?)',
+                             (source, ticker, str(span[0]), str(span[1]), time.time()))
+
+        return span
+
+    def read(self, source, ticker, start=None, end=None):
+        query = 'SELECT * FROM prices WHERE source = ? AND ticker = ?'
+        params = [source, ticker]
+        if start is not None:
+            query += ' AND date >= ?'
+            params.append(str(to_date(start)))
+        if end is not None:
+            query += ' AND date < ?'
+            params.append(str(to_date(end)))
+
+        with self.connect() as conn:
+            frame = pd.read_sql_query(query + ' ORDER BY date', conn, params=params)
+
+        frame = frame.drop(columns=['source', 'ticker'])
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop('date')), name='Date')
+
+        return frame.dropna(axis=1, how='all')
+
+
+    # Main
+
+    def get(self, source, ticker, start, end, fetch):
+        '''
+        Prices of ticker in [start, end): cached rows + fetch(ticker, start, end) for missing ranges only.
+        Missing ranges are requested overlap_days into the cached neighbours -> the new segment is rescaled onto them.
+        '''
+        if not self.offline:
+            overlap = datetime.timedelta(days=self.overlap_days)
+            for a, b in self.missing_ranges(source, ticker, start, end):
+                frame = fetch(ticker, start=str(a - overlap), end=str(b + overlap))
+                self.store(source, ticker, a, b, frame)
+
+        return self.read(source, ticker, start, end)
+
+    def clear(self, source=None, ticker=None):
+        conditions, params = [], []
+        if source is not None:
+            conditions.append('source = ?')
+            params.append(source)
+        if ticker is not None:
+            conditions.append('ticker = ?')
+            params.append(ticker)
+        where = (' WHERE ' + ' AND '.join(conditions)) if conditions else ''
+
+        with self.lock, self.connect() as conn:
+            conn.execute('DELETE FROM prices' + where, params)
+            conn.execute('DELETE FROM coverage' + where, params)
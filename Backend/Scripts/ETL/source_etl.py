@@ -2,30 +2,92 @@
 
 import os
 import sys
+import time
 
 sys.dont_write_bytecode = True
 
 import datetime
+import concurrent.futures
 import numpy as np
 import pandas as pd
-import yfinance as yf
 
 
 # Base
 
 class Source:
 
-    def __init__(self, tickers=None):
+    name = 'Source'
+
+    def __init__(self, tickers=None, cache=None):
         if tickers is None:
             self.tickers = {}
         else:
             self.tickers = {}
+        self.ticker_mapping = {} if tickers is None else tickers
+        self.cache = cache
+        self.errors = {}
+        self.data = None
 
-    def fetch(self, ticker, **kwargs):
+    def download(self, ticker, start=None, end=None, period='max'):
+        '''Raw request to the source (no cache).'''
         return pd.DataFrame()
-    
-    def fetch_adjusted_data(self, ticker, **kwargs):
-        pass
+
+    def fetch(self, ticker, start=None, end=None, period='max'):
+        '''Prices of ticker in [start, end) -> through the price cache (if set) for explicit date ranges.'''
+        if self.cache is None or start is None or end is None:
+            return self.download(ticker, start=start, end=end, period=period)
+        return self.cache.get(self.name, ticker, start, end, fetch=self.download)
+
+    def fetch_with_retry(self, ticker, start=None, end=None, period='max', retries=2, backoff=1.0):
+        '''fetch with exponential backoff; an empty frame counts as a failed attempt.'''
+        for attempt in range(retries + 1):
+            try:
+                data = self.fetch(ticker, start, end, period)
+                if data is None or data.empty:
+                    raise ValueError(f'No data returned for ticker: {ticker}')
+                return data
+            except Exception:
+                if attempt == retries:
+                    raise
+                time.sleep(backoff * 2 ** attempt)
+
+    def fetch_adjusted_data(self, start=None, end=None, period='max', workers=8, retries=2, backoff=1.0):
+        '''
+        Fetches all tickers of ticker_mapping concurrently (bounded thread pool).
+        Tickers failing after all retries are left out of the result and reported in self.errors.
+        '''
+        self.data = pd.DataFrame()
+        self.errors = {}
+
+        items = list(self.ticker_mapping.items())
+        frames = {}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, len(items) or 1))) as pool:
+            futures = {
+                pool.submit(self.fetch_with_retry, ticker, start, end, period, retries, backoff): name
+                for name, ticker in items
+            }
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    frames[name] = future.result()
+                except Exception as e:
+                    self.errors[name] = str(e)
+
+        result = []
+        for name, _ in items:
+            if name not in frames:
+                continue
+            ticker_data = frames[name].reset_index()
+            ticker_data['ticker'] = name
+            ticker_data['start'] = str(start)
+            ticker_data['end'] = str(end)
+            result.append(ticker_data)
+
+        if result:
+            self.data = pd.concat(result, ignore_index=True)
+
+        return self.data
 
 # ---
 
@@ -36,9 +98,10 @@ class Source:
 
 class Yahoo(Source):
 
-    def __init__(self, ticker_mapping):
-        self.ticker_mapping = ticker_mapping
-        self.data = None
+    name = 'Yahoo'
+
+    def __init__(self, ticker_mapping, cache=None):
+        super().__init__(ticker_mapping, cache=cache)
 
     def add_timedelta(self, date, delta, return_type='str'):
         date_obj = datetime.datetime.strptime(date, '%Y-%m-%d')
@@ -48,33 +111,54 @@ class Yahoo(Source):
         return new_date
 
 
+    def download(self, ticker, start=None, end=None, period='max'):
+        # NOTE: imported on use -> Source / Local (offline) work without yfinance
+        import yfinance as yf
+
+        try:
+            return yf.Ticker(ticker).history(start=start, end=end, period=period, auto_adjust=False)
+        except:
+            raise ValueError(f'Error during fetching Yahoo --> ticker: {ticker}; params = ({start, end})')
+
     def fetch(self, ticker, start=None, end=None, period='max'):
         if start is not None:
             start = self.add_timedelta(start, delta=-1)
         if end is not None:
             end = self.add_timedelta(end, delta=1) 
 
-        try:
-            return yf.Ticker(ticker).history(start=start, end=end, period=period, auto_adjust=False)
-        except:
-            raise ValueError(f'Error during fetching Yahoo --> ticker: {ticker}; params = ({start, end})')
+        return super().fetch(ticker, start=start, end=end, period=period)
 
 
-    def fetch_adjusted_data(self, start=None, end=None, period='max'):
-        self.data = pd.DataFrame()
+# Local (offline / stub source)
 
-        result = []
-        for name, ticker in self.ticker_mapping.items():
-            ticker_data = self.fetch(ticker, start, end, period).reset_index()
-            ticker_data['ticker'] = name
-            ticker_data['start'] = str(start)
-            ticker_data['end'] = str(end)
-            result.append(ticker_data)
-        
-        result = pd.concat(result, ignore_index=True)
-        self.data = result
-        
-        return result
+class Local(Source):
+    '''Serves prices from in-memory DataFrames (ticker -> frame indexed by date); latency simulates a remote source.'''
+
+    name = 'Local'
+
+    def __init__(self, ticker_mapping, frames, cache=None, latency=0.0):
+        super().__init__(ticker_mapping, cache=cache)
+        self.frames = frames
+        self.latency = latency
+
+    def download(self, ticker, start=None, end=None, period='max'):
+        if self.latency:
+            time.sleep(self.latency)
+        if ticker not in self.frames:
+            raise ValueError(f'Error during fetching Local --> ticker: {ticker}')
+
+        data = self.frames[ticker]
+        dates = pd.DatetimeIndex(data.index)
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+
+        mask = np.ones(len(data), dtype=bool)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates < pd.Timestamp(end)
+
+        return data[mask]
 
 
 # ---
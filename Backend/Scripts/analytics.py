@@ -26,7 +26,7 @@ from Configs.asset_crissis_mapping import *
 
 class AnalyticsPipeline:
 
-    def __init__(self, asset_mapping=None, period_mapping=None):
+    def __init__(self, asset_mapping=None, period_mapping=None, cache=None):
         if asset_mapping is None:
             self.asset_mapping = {}
         else:
@@ -37,6 +37,10 @@ class AnalyticsPipeline:
             self.period_mapping = period_mapping
 
         self.asset_period_data = {}
+        self.asset_history = {}
+
+        # NOTE: optional PriceCache (ETL/price_cache.py) -> shared with the Yahoo source
+        self.cache = cache
 
         self.descriptive_data = None
         self.cq_result_data   = None
@@ -53,21 +57,57 @@ class AnalyticsPipeline:
         except:
             self.asset_period_data = pd.read_csv(file_path + file_name)
 
-    def load_data(self):
+    def load_data(self, buffer_days=10):
+        '''
+        Fetch-once loader: every asset is fetched a single time over the union of all (period, phase) ranges
+        (+ buffer_days of history), log returns are computed once on the full history and each phase gets
+        a date slice of it -> the first return of a phase is computed from the preceding close, not dropped.
+        '''
+        ranges = [dates for data in self.period_mapping.values() for dates in data.values()]
+        if not ranges:
+            return self.asset_period_data
+
+        history_start = self.add_timedelta(min(start for start, _ in ranges), delta=-buffer_days)
+        history_end = max(end for _, end in ranges)
+
+        self.asset_history = {}
+        for asset, ticker in self.asset_mapping.items():
+            history = self.fetch_data_adjusted(ticker=ticker, start=history_start, end=history_end)
+            history['asset_name'] = asset
+            self.asset_history[asset] = history
+
         for period, data in self.period_mapping.items():
             self.asset_period_data[period] = {}
-            
+
             for phase, dates in data.items():
                 self.asset_period_data[period][phase] = {}
                 start, end = dates
-                
-                for asset, ticker in self.asset_mapping.items():
-                    ticker_data = self.fetch_data_adjusted(ticker=ticker, start=start, end=end)
-                    ticker_data['asset_name'] = asset
-                    self.asset_period_data[period][phase][asset] = ticker_data
+
+                for asset, history in self.asset_history.items():
+                    self.asset_period_data[period][phase][asset] = self.slice_phase(history, start, end)
+
+        overlaps = self.phase_overlaps()
+        if overlaps:
+            raise ValueError(f'Adjacent phases share return observations: {overlaps}')
 
         return self.asset_period_data
 
+    def slice_phase(self, history, start, end):
+        # NOTE: returns computed on the buffered history, rows restricted to [start, end] -> adjacent phases never share a return
+        return history.loc[start:end]
+
+    def phase_overlaps(self, full_phase='full_period'):
+        '''(period, phase, next phase, asset, shared dates) of consecutive sub-phases whose slices share index labels.'''
+        overlaps = []
+        for period, phases in self.asset_period_data.items():
+            ordered = sorted((phase for phase in phases if phase != full_phase), key=lambda phase: self.period_mapping[period][phase][0])
+            for phase, next_phase in zip(ordered, ordered[1:]):
+                for asset, data in phases[phase].items():
+                    shared = data.index.intersection(phases[next_phase][asset].index)
+                    if len(shared):
+                        overlaps.append((period, phase, next_phase, asset, list(shared)))
+        return overlaps
+
 
     def add_timedelta(self, date, delta, return_type='str'):
         date_obj = datetime.datetime.strptime(date, '%Y-%m-%d')
@@ -81,13 +121,19 @@ class AnalyticsPipeline:
         X_new['log_return'] = np.log(X_new['Adj Close'] / X_new['Adj Close'].shift(1))
         return X_new
 
+    def download(self, ticker, start=None, end=None, period='max'):
+        return yf.Ticker(ticker).history(start=start, end=end, period=period, auto_adjust=False)
+
     def fetch_data_adjusted(self, ticker, start=None, end=None, period='max'):
         if start is not None:
             start = self.add_timedelta(start, delta=-1)
         if end is not None:
             end = self.add_timedelta(end, delta=1)
         
-        output = yf.Ticker(ticker).history(start=start, end=end, period=period, auto_adjust=False)
+        if self.cache is not None and start is not None and end is not None:
+            output = self.cache.get('Yahoo', ticker, start, end, fetch=self.download)
+        else:
+            output = self.download(ticker, start=start, end=end, period=period)
         output = self.compute_log_returns(output)
         output = output.dropna(subset='log_return')
 
@@ -13,6 +13,10 @@ import yfinance as yf
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+try:
+    from ETL.cqgram_engine import BootstrapPlan, postprocess_CQBS, rolling_CQBS
+except ModuleNotFoundError:
+    from Backend.Scripts.ETL.cqgram_engine import BootstrapPlan, postprocess_CQBS, rolling_CQBS
 
 
 
@@ -126,8 +130,7 @@ class CQGramPipeline:
     def Q_statistic_test(self, result):
         '''rules for q-statistic and H0 rejection -> no directional predictability'''
 
-        rule = result.apply(lambda row: abs(row['q']) > row['qc'], axis=1)
-        result['H0_rejected'] = rule
+        result['H0_rejected'] = result['q'].abs() > result['qc']
         return result
     
 
@@ -337,87 +340,80 @@ class CQGramPipeline:
 
 
     def compute_rolling_CQBS(self, window=21, max_lag=1, tau1_list=None, tau2_list=None, jump=0, **kwargs):
+        '''Rolling-window Cross-Quantilogram for every pair (incremental engine -> cqgram_engine.rolling_CQBS).
+            - jump: step between consecutive emitted windows (0/1 -> every observation)
+            kwargs:
+                - start, end: time-series alignment subset
+                - bootstrap_plan: BootstrapPlan of the bootstrap critical values
+                  (default: one plan of n resamples (default 1000), seed (default None, as compute_CQBS), block_length shared by all pairs)
+                - critical_values: 'bootstrap' (default, as CQBS) or 'chi2' -> asymptotic chi-square(p) of Q(p),
+                  no confidence band (cq_upper / cq_lower NaN)
+            cost: the incremental update makes cq / q O(1) per emitted window only with critical_values='chi2';
+                  'bootstrap' recomputes the stationary bootstrap of every emitted window -> O(n * window) per window,
+                  which dominates the run (same order as one compute_CQBS per window). Use jump to emit fewer windows.
+        '''
 
         if tau1_list is None:
             tau1_list = []
         if tau2_list is None:
             tau2_list = []
 
-
-        result_collection = []
-    
+        pairs = []
         for benchmark in self.data['benchmarks'].keys():
-            X = self.data['benchmarks'][benchmark]['log_return'].dropna()
-
             for candidate in self.data['candidates'].keys():
                 if benchmark != candidate:
-                    Y = self.data['candidates'][candidate]['log_return'].dropna()
-                    
-                    X_align, Y_align = self.align_series(X, Y, start=kwargs.get('start', None), end=kwargs.get('end', None))
-
-                    if len(X_align) < window:
-                        continue
-
-                    for i in range(window, len(X_align) + 1):
-                        # The window is [i-window, i)
-                        X_window = X_align.iloc[i-window:i]
-                        Y_window = Y_align.iloc[i-window:i]
-
-                        pair_result_dict = self.compute_pair_CQBS(
-                            Y_window, tau2_list,    # Y & tau2
-                            X_window, tau1_list,    # X & tau1
-                            max_lag=max_lag,
-                            benchmark=benchmark,
-                            candidate=candidate,
-                            **kwargs
-                        )
-
-                        df_temp = self.create_dataframe_from_cqgram(pair_result_dict)
-
-                        rolling_date = X_window.index[-1]
-                        df_temp['rolling_date'] = rolling_date
-
-                        result_collection.append(df_temp)
+                    pairs.append((benchmark, candidate, self.data['candidates'][candidate]))
 
             # benchmarky included
             if self.include_benchmarks:
                 for benchmark2 in self.data['benchmarks'].keys():
                     if benchmark != benchmark2:
-                        Y = self.data['benchmarks'][benchmark2]['log_return'].dropna()
-                        
-                        X_align, Y_align = self.align_series(X, Y, start=kwargs.get('start', None), end=kwargs.get('end', None))
+                        pairs.append((benchmark, benchmark2, self.data['benchmarks'][benchmark2]))
 
-                        if len(X_align) < window:
-                            continue
+        bootstrap_plan = None
+        if kwargs.get('critical_values', 'bootstrap') == 'bootstrap':
+            bootstrap_plan = kwargs.get('bootstrap_plan', None) or BootstrapPlan(n=kwargs.get('n', 1000),
+                                                                                  block_length=kwargs.get('block_length', None),
+                                                                                  seed=kwargs.get('seed', None))
 
-                        for i in range(window, len(X_align) + 1):
-                            # The window is [i-window, i)
-                            X_window = X_align.iloc[i-window:i]
-                            Y_window = Y_align.iloc[i-window:i]
+        columns = {}
 
-                            pair_result_dict = self.compute_pair_CQBS(
-                                Y_window, tau2_list,    # Y & tau2
-                                X_window, tau1_list,    # X & tau1
-                                max_lag=max_lag,
-                                benchmark=benchmark,
-                                candidate=candidate,
-                                **kwargs
-                            )
+        for benchmark, candidate, candidate_data in pairs:
+            X = self.data['benchmarks'][benchmark]['log_return'].dropna()
+            Y = candidate_data['log_return'].dropna()
 
-                            df_temp = self.create_dataframe_from_cqgram(pair_result_dict)
+            X_align, Y_align = self.align_series(X, Y, start=kwargs.get('start', None), end=kwargs.get('end', None))
 
-                            rolling_date = X_window.index[-1]
-                            df_temp['rolling_date'] = rolling_date
+            if len(X_align) < window:
+                continue
 
-                            result_collection.append(df_temp)
-        
+            # NOTE: (X, Y) -> (Y, X) switch as in compute_CQBS -> grid axes are (window, tau2, tau1, lag)
+            grid = rolling_CQBS(Y_align, tau2_list, X_align, tau1_list, window, max_lag=max_lag, step=jump,
+                                bootstrap_plan=bootstrap_plan)
+
+            shape = grid['cq'].shape
+            per_window = int(np.prod(shape[1:]))
+            # NOTE: datetime.date labels (align_series) -> same date_start / date_end / rolling_date values as the per-window CQBS path
+            dates = np.asarray(X_align.index, dtype=object)
+
+            block = postprocess_CQBS(grid, max_lag, normalize_significance=self.normalize_significance)
+            block['max_lag'] = np.full(block['cq'].size, max_lag)
+            block['date_start'] = np.repeat(dates[grid['end'] - window + 1], per_window)
+            block['date_end'] = np.repeat(dates[grid['end']], per_window)
+            block['index'] = np.full(block['cq'].size, benchmark, dtype=object)
+            block['asset'] = np.full(block['cq'].size, candidate, dtype=object)
+            block['tau2'] = np.broadcast_to(np.asarray(tau2_list, dtype=float)[None, :, None, None], shape).ravel()
+            block['tau1'] = np.broadcast_to(np.asarray(tau1_list, dtype=float)[None, None, :, None], shape).ravel()
+            block['stationarity_satisfied'] = np.full(block['cq'].size, True)
+            block['rolling_date'] = block['date_end']
+
+            for column, values in block.items():
+                columns.setdefault(column, []).append(values)
 
-        if result_collection:
-            final_df = pd.concat(result_collection, ignore_index=True)
-        else:
-            final_df = pd.DataFrame()
+        if not columns:
+            return pd.DataFrame()
 
-        return final_df
+        return pd.DataFrame({column: np.concatenate(values) for column, values in columns.items()})
 
 
 
@@ -5,6 +5,8 @@ import os
 import numpy as np
 import pandas as pd
 
+from Shared.dimensions import AssetDimension
+
 
 
 
@@ -16,10 +18,19 @@ def select_phase(data, phase='full_period'):
     return data.query(f"phase == '{phase}'")
 
 
-def map_metadata(data, metadata=None):
-    if metadata is None:
-        return data
+def metadata_names(data, metadata):
+    '''Output column names of the two left merges of map_metadata (suffixes ('', '_benchmark') / ('', '_candidate')).'''
+    columns = list(data.columns)
+    names = {}
+    for key, suffix in [('index', '_benchmark'), ('asset', '_candidate')]:
+        names[key] = {}
+        for column in metadata.columns:
+            names[key][column] = column + suffix if column in columns else column
+            columns.append(names[key][column])
+    return names
+
 
+def merge_metadata(data, metadata):
     #df_1 = pd.merge(data, metadata, left_on='index', right_on='name')
     # df_2 = pd.merge(data, metadata, left_on='asset', right_on='name', suffixes=('_benchmark', '_candidate'))
 
@@ -32,41 +43,137 @@ def map_metadata(data, metadata=None):
     return df_2
 
 
+def map_metadata(data, metadata=None, categorical=False, before=None):
+    '''
+    Benchmark (index) & candidate (asset) metadata as columns, resolved through an AssetDimension
+    (same columns, order & values as left merges on metadata['name']).
+        - categorical: index / asset & metadata columns kept as codes into the dimension (small memory footprint)
+        - before: metadata columns are inserted before this column (default: appended)
+    Duplicate metadata names multiply rows in a merge -> merge path.
+    '''
+    if metadata is None:
+        return data
+
+    if metadata['name'].dropna().duplicated().any():
+        return merge_metadata(data, metadata)
+
+    dimension = AssetDimension.for_data(metadata, data) if categorical else AssetDimension(metadata)
+    return dimension.attach(data, metadata_names(data, metadata), how='left', before=before, categorical=categorical)
+
+
 def map_period_timestamps(data, metadata, how='left'):
     df_1 = pd.merge(data, metadata, on=['period', 'phase'], how=how)
     return df_1
 
 
-def load_period(input_dir, period_dir, metadata):
-    dfs = []
-    for file in os.listdir(input_dir + period_dir):
-        metadata_2 = file.split('__')
-        df = pd.read_csv(input_dir + period_dir + file)
+# NOTE: explicit dtypes of the result CSV columns (skips per-file type inference of the known columns)
+RESULT_DTYPES = {
+    'index' : 'str', 'asset' : 'str', 'date_start' : 'str', 'date_end' : 'str',
+    'tau1' : 'float64', 'tau2' : 'float64',
+    'cq' : 'float64', 'cq_upper' : 'float64', 'cq_lower' : 'float64', 'q' : 'float64', 'qc' : 'float64',
+}
 
-        #print(df.shape)
+LABEL_COLUMNS = ['selection', 'period', 'phase', 'source', 'file']
 
-        df_mapped = map_metadata(df, metadata)
 
-        df_mapped['selection'] = metadata_2[0]
-        df_mapped['period'] = metadata_2[1]
-        df_mapped['phase'] = metadata_2[2]
-        df_mapped['source'] = input_dir + period_dir
-        df_mapped['file'] = file
+def read_result_file(path):
+    '''
+    Result CSV with explicit dtypes of the known columns.
+    pyarrow (when installed) parses natively & releases the GIL -> files of the thread pool are parsed in parallel.
+    '''
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pv
+    except ImportError:
+        header = pd.read_csv(path, nrows=0).columns
+        return pd.read_csv(path, dtype={column: dtype for column, dtype in RESULT_DTYPES.items() if column in header})
 
-        dfs.append(df_mapped)
+    types = {'str' : pa.string(), 'float64' : pa.float64()}
+    options = pv.ConvertOptions(column_types={column: types[dtype] for column, dtype in RESULT_DTYPES.items()},
+                                strings_can_be_null=True)
+    data = pv.read_csv(path, convert_options=options).to_pandas()
 
-    try:
-        return pd.concat(dfs, ignore_index=True)
-    except:
+    # NOTE: saved index column is named '' by pyarrow, 'Unnamed: i' by pandas
+    data.columns = [column if column != '' else f'Unnamed: {i}' for i, column in enumerate(data.columns)]
+    return data
+
+
+def result_files(input_dir, period_dir):
+    return [(input_dir + period_dir, file) for file in os.listdir(input_dir + period_dir)]
+
+
+def load_files(files, metadata=None, workers=8, categorical=False):
+    '''
+    Reads (source, file) CSVs concurrently, concatenates them once, then labels the rows (selection / period /
+    phase parsed from the file name) and maps the metadata once for all files.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not files:
         return pd.DataFrame()
 
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files)))) as pool:
+        frames = list(pool.map(lambda entry: read_result_file(entry[0] + entry[1]), files))
+
+    data = pd.concat(frames, ignore_index=True)
 
-def full_data_load(input_dir, metadata):
-    periods = []
-    for file in os.listdir(input_dir):
-        if os.path.isdir(input_dir + file):
-            period = load_period(input_dir, file + '/', metadata)
-            periods.append(period)
+    # NOTE: labels per file, broadcast through file codes
+    codes = np.repeat(np.arange(len(files)), [len(frame) for frame in frames])
+    for i, column in enumerate(LABEL_COLUMNS):
+        values = [(*file.split('__')[:3], source, file)[i] for source, file in files]
+        data[column] = pd.Series(values).take(codes).set_axis(data.index)
+
+    return map_metadata(data, metadata, categorical=categorical, before='selection')
+
+
+def load_period(input_dir, period_dir, metadata, workers=8, categorical=False):
+    try:
+        return load_files(result_files(input_dir, period_dir), metadata, workers=workers, categorical=categorical)
+    except:
+        return pd.DataFrame()
 
-    return pd.concat(periods)
 
+def snapshot_valid(snapshot, input_dir, directories):
+    '''Snapshot is newer than every period directory & result file (added / removed / rewritten files -> stale).'''
+    if snapshot is None or not os.path.exists(snapshot):
+        return False
+
+    mtime = os.stat(snapshot).st_mtime_ns
+    if os.stat(input_dir).st_mtime_ns > mtime:
+        return False
+    for directory in directories:
+        if os.stat(input_dir + directory).st_mtime_ns > mtime:
+            return False
+        for file in os.listdir(input_dir + directory):
+            if os.stat(input_dir + directory + file).st_mtime_ns > mtime:
+                return False
+    return True
+
+
+def full_data_load(input_dir, metadata, workers=8, snapshot=None, categorical=False):
+    '''
+    Loads every period directory of input_dir (files read concurrently by one thread pool).
+    snapshot: Parquet file with the consolidated (unmapped) results -> later loads skip CSV parsing while the
+    snapshot is newer than the CSVs; metadata is mapped after loading so the snapshot does not depend on it.
+    categorical: index / asset & metadata as codes into an AssetDimension (see map_metadata)
+    '''
+    directories = [file + '/' for file in os.listdir(input_dir) if os.path.isdir(input_dir + file)]
+
+    if snapshot_valid(snapshot, input_dir, directories):
+        data = pd.read_parquet(snapshot)
+        return map_metadata(data, metadata, categorical=categorical, before='selection')
+
+    files = [entry for directory in directories for entry in result_files(input_dir, directory)]
+    data = load_files(files, None, workers=workers)
+
+    # NOTE: row index restarts for every period directory (as concatenated per period)
+    if len(data):
+        data.index = data.groupby('source', sort=False).cumcount().to_numpy()
+
+    if snapshot is not None and len(data):
+        try:
+            data.to_parquet(snapshot)
+        except (ImportError, OSError, ValueError):
+            pass
+
+    return map_metadata(data, metadata, categorical=categorical, before='selection')
@@ -9,6 +9,13 @@ from matplotlib.lines import Line2D
 
 from Scripts.PROD.constants import *
 
+from Shared.graphs import cq_to_color, cq_to_colors, create_nx_network
+
+try:
+    from Scripts.topology import DensityCube, spillover_group_degrees
+except ModuleNotFoundError:
+    from Backend.Scripts.topology import DensityCube, spillover_group_degrees
+
 
 # NETWORKS
 
@@ -22,32 +29,20 @@ def select_data_subset(data, period, phase, tau1=None, tau2=None):
     return copy.query(f'period == "{period}" and phase == "{phase}"')
 
 
-def create_nx_network(data, width_factor=1):
-    import networkx as nx
-    G = nx.DiGraph()
-    nodes = set(data['index']) | set(data['asset'])
-    G.add_nodes_from(nodes)
-    for _, row in data.iterrows():
-        if row['H0_rejected']:
-            width = abs(row['cq']) * width_factor
-            color = cq_to_color(row['cq'])
-            G.add_edge(row['index'], row['asset'], cq=row['cq'], tau1=row['tau1'], tau2=row['tau2'], width=width, color=color)
-    
-    return G
-
-
 # TOPOLOGY
 
-def get_network_density(data, LOW=0.05, HIGH=0.95, include_spillover=False, return_pivot=True):
-    node_count = data['index'].unique().shape[0]
+def get_network_density(data, LOW=0.05, HIGH=0.95, include_spillover=False, return_pivot=True, cube=None):
+    # NOTE: edge counts sliced from a density cube (Scripts/topology.py) -> pass cube= to reuse one across tables
+    if cube is None:
+        cube = DensityCube(data)
+
+    node_count = cube.total_nodes
     denominator = node_count * (node_count - 1)
     
-    edge_subset = data.query(f'H0_rejected and tau1 in ({LOW},) and tau2 in ({LOW, HIGH})')
-    
     grouping_cols = ['period', 'phase']
     if include_spillover:
         grouping_cols += ['spillover']
-    grouping = edge_subset.groupby(grouping_cols)['cq'].count() / denominator
+    grouping = cube.edge_counts(grouping_cols, tau1=(LOW,), tau2=(LOW, HIGH), column='edge_cq_n').rename('cq') / denominator
 
     if return_pivot:
         return grouping.reset_index().pivot(
@@ -59,29 +54,19 @@ def get_network_density(data, LOW=0.05, HIGH=0.95, include_spillover=False, retu
     return grouping.reset_index()
 
 
-def get_network_density_FIXED(data, LOW=0.05, HIGH=0.95, include_spillover=False, return_pivot=True):
+def get_network_density_FIXED(data, LOW=0.05, HIGH=0.95, include_spillover=False, return_pivot=True, cube=None):
     grouping_cols = ["period", "phase"]
     if include_spillover:
         grouping_cols.append("spillover")
 
-    allowed_tau2 = (LOW, HIGH)               # (0.05, 0.95)
-    edge_subset = data.query(
-        "H0_rejected and tau1 == @LOW and tau2 in @allowed_tau2"
-    )
+    # NOTE: edge & node counts sliced from a density cube (Scripts/topology.py) -> pass cube= to reuse one across tables
+    if cube is None:
+        cube = DensityCube(data)
 
-    edge_n = (
-        edge_subset
-        .groupby(grouping_cols, observed=True)
-        .size()
-        .rename("edge_n")
-    )
+    allowed_tau2 = (LOW, HIGH)               # (0.05, 0.95)
+    edge_n = cube.edge_counts(grouping_cols, tau1=(LOW,), tau2=allowed_tau2).rename("edge_n")
 
-    
-    node_n = (
-        data.groupby(grouping_cols, observed=True)["index"]
-            .nunique()
-            .rename("node_n")
-    )
+    node_n = cube.node_counts(grouping_cols)
 
     
     dens = (
@@ -106,31 +91,13 @@ def get_network_density_FIXED(data, LOW=0.05, HIGH=0.95, include_spillover=False
 def compute_net_centralities_periods(data, phase):
     grouping = data.query(f'H0_rejected and phase == "{phase}"')
     grouping = grouping.query('spillover in ("Safe-Haven", "Contagion")')
-    grouping = grouping.groupby(['period', 'phase'])
 
-    res = []
-    for group, df in grouping:
-        period, phase = group
+    # NOTE: all (period, phase) groups at once -> sparse engine (Scripts/topology.py)
+    df_res = spillover_group_degrees(grouping, ['period', 'phase'])
+    df_res['net_in_deg_centrality'] = df_res['in_centrality_sh'] - df_res['in_centrality_cn']
+    df_res['net_out_deg_centrality'] = df_res['out_centrality_sh'] - df_res['out_centrality_cn']
 
-        G_group_sh = create_nx_network(df.query('spillover == "Safe-Haven"'))
-        G_group_cn = create_nx_network(df.query('spillover == "Contagion"'))
-
-        df_group = pd.DataFrame()
-        df_group['safe_haven_in_deg_centrality'] = nx.in_degree_centrality(G_group_sh)
-        df_group['contagion_in_deg_centrality']  = nx.in_degree_centrality(G_group_cn)
-        df_group['safe_haven_out_deg_centrality'] = nx.out_degree_centrality(G_group_sh)
-        df_group['contagion_out_deg_centrality'] = nx.out_degree_centrality(G_group_cn)
-
-        df_group['net_in_deg_centrality'] = df_group['safe_haven_in_deg_centrality'] - df_group['contagion_in_deg_centrality']
-        df_group['net_out_deg_centrality'] = df_group['safe_haven_out_deg_centrality'] - df_group['contagion_out_deg_centrality']
-
-        df_group[['period', 'phase']] = period, phase
-        
-        res.append(df_group)
-
-    df_res = pd.concat(res)
-
-    output = df_res.reset_index().query('phase == "full_period"').pivot(
+    output = df_res.query('phase == "full_period"').pivot(
         index='index',
         columns=['period', 'phase'],
         values = ['net_in_deg_centrality', 'net_out_deg_centrality']
@@ -165,17 +132,13 @@ def compute_topology_summary_table(data, all_phases=False, **kwargs):
     if TARGET_ASSET:
         subset = subset.query('index == @TARGET_ASSET')
 
-    grouping = subset.query('H0_rejected and spillover in ("Safe-Haven", "Contagion")').groupby(['period', 'phase'])
-    res = []
-    for group, df in grouping:
-        group_period, group_phase = group
-        G_group_sh = create_nx_network(df.query('spillover == "Safe-Haven"'))
-        G_group_cn = create_nx_network(df.query('spillover == "Contagion"'))
+    grouping = subset.query('H0_rejected and spillover in ("Safe-Haven", "Contagion")')
 
-        G_group_sh.add_nodes_from(assets)
-        G_group_cn.add_nodes_from(assets)
+    # NOTE: all (period, phase) groups at once -> sparse engine (Scripts/topology.py)
+    res = spillover_group_degrees(grouping, ['period', 'phase'], nodes=assets)
 
-        df_group = pd.DataFrame()
+    norms = {}
+    for group_period, group_phase in res[['period', 'phase']].drop_duplicates().itertuples(index=False):
 
         # dynamicka norma -> nech normalizuje len poctom realnych assets
         if group_period in ['GFC', 'ESDC']:
@@ -188,30 +151,28 @@ def compute_topology_summary_table(data, all_phases=False, **kwargs):
         else:
             norm = 1
 
-        # normalizovany objem
-        df_group['in_deg_weight_norm_sh'] = pd.Series(dict(G_group_sh.in_degree(weight='cq'))) / norm
-        df_group['in_deg_weight_norm_cn'] = pd.Series(dict(G_group_cn.in_degree(weight='cq'))) / norm
+        norms[(group_period, group_phase)] = norm
 
-        df_group['net_in_deg_weight_norm'] = df_group['in_deg_weight_norm_sh'] + df_group['in_deg_weight_norm_cn']
+    norm = pd.MultiIndex.from_frame(res[['period', 'phase']]).map(norms).to_numpy(dtype=float)
 
-        # in deg centralita
-        df_group['in_deg_centrality_sh']  = pd.Series(nx.in_degree_centrality(G_group_sh))
-        df_group['in_deg_centrality_cn']  = pd.Series(nx.in_degree_centrality(G_group_cn))
+    # normalizovany objem
+    res['in_deg_weight_norm_sh'] = res['in_weight_sh'] / norm
+    res['in_deg_weight_norm_cn'] = res['in_weight_cn'] / norm
 
-        df_group['net_in_deg_centrality'] = df_group['in_deg_centrality_sh'] - df_group['in_deg_centrality_cn']
+    res['net_in_deg_weight_norm'] = res['in_deg_weight_norm_sh'] + res['in_deg_weight_norm_cn']
 
-        # metadata
-        df_group[['period', 'phase']] = group_period, group_phase
-        res.append(df_group)
-    
-    res = pd.concat(res)
+    # in deg centralita
+    res['in_deg_centrality_sh'] = res['in_centrality_sh']
+    res['in_deg_centrality_cn'] = res['in_centrality_cn']
+
+    res['net_in_deg_centrality'] = res['in_deg_centrality_sh'] - res['in_deg_centrality_cn']
 
     if all_phases:
         phases = ['full_period', 'phase_I', 'phase_II', 'phase_III']
     else:
         phases = [phase]
 
-    output = res.reset_index().query(f'phase in @phases').pivot(
+    output = res.query(f'phase in @phases').pivot(
         index=['index'],
         columns=['period', 'phase'],
         values=['net_in_deg_weight_norm', 'net_in_deg_centrality']
@@ -258,17 +219,13 @@ def compute_topology_summary_table_OUT_DEGREE(data, all_phases=False, **kwargs):
     if TARGET_ASSET:
         subset = subset.query('index == @TARGET_ASSET')
 
-    grouping = subset.query('H0_rejected and spillover in ("Safe-Haven", "Contagion")').groupby(['period', 'phase'])
-    res = []
-    for group, df in grouping:
-        group_period, group_phase = group
-        G_group_sh = create_nx_network(df.query('spillover == "Safe-Haven"'))
-        G_group_cn = create_nx_network(df.query('spillover == "Contagion"'))
+    grouping = subset.query('H0_rejected and spillover in ("Safe-Haven", "Contagion")')
 
-        G_group_sh.add_nodes_from(assets)
-        G_group_cn.add_nodes_from(assets)
+    # NOTE: all (period, phase) groups at once -> sparse engine (Scripts/topology.py)
+    res = spillover_group_degrees(grouping, ['period', 'phase'], nodes=assets)
 
-        df_group = pd.DataFrame()
+    norms = {}
+    for group_period, group_phase in res[['period', 'phase']].drop_duplicates().itertuples(index=False):
 
         # dynamicka norma -> nech normalizuje len poctom realnych assets
         if group_period in ['GFC', 'ESDC']:
@@ -281,30 +238,28 @@ def compute_topology_summary_table_OUT_DEGREE(data, all_phases=False, **kwargs):
         else:
             norm = 1
 
-        # normalizovany objem
-        df_group['out_deg_weight_norm_sh'] = pd.Series(dict(G_group_sh.out_degree(weight='cq'))) / norm
-        df_group['out_deg_weight_norm_cn'] = pd.Series(dict(G_group_cn.out_degree(weight='cq'))) / norm
+        norms[(group_period, group_phase)] = norm
 
-        df_group['net_out_deg_weight_norm'] = df_group['out_deg_weight_norm_sh'] + df_group['out_deg_weight_norm_cn']
+    norm = pd.MultiIndex.from_frame(res[['period', 'phase']]).map(norms).to_numpy(dtype=float)
 
-        # in deg centralita
-        df_group['out_deg_centrality_sh']  = pd.Series(nx.out_degree_centrality(G_group_sh))
-        df_group['out_deg_centrality_cn']  = pd.Series(nx.out_degree_centrality(G_group_cn))
+    # normalizovany objem
+    res['out_deg_weight_norm_sh'] = res['out_weight_sh'] / norm
+    res['out_deg_weight_norm_cn'] = res['out_weight_cn'] / norm
 
-        df_group['net_out_deg_centrality'] = df_group['out_deg_centrality_sh'] - df_group['out_deg_centrality_cn']
+    res['net_out_deg_weight_norm'] = res['out_deg_weight_norm_sh'] + res['out_deg_weight_norm_cn']
 
-        # metadata
-        df_group[['period', 'phase']] = group_period, group_phase
-        res.append(df_group)
-    
-    res = pd.concat(res)
+    # out deg centralita
+    res['out_deg_centrality_sh'] = res['out_centrality_sh']
+    res['out_deg_centrality_cn'] = res['out_centrality_cn']
+
+    res['net_out_deg_centrality'] = res['out_deg_centrality_sh'] - res['out_deg_centrality_cn']
 
     if all_phases:
         phases = ['full_period', 'phase_I', 'phase_II', 'phase_III']
     else:
         phases = [phase]
 
-    output = res.reset_index().query(f'phase in @phases').pivot(
+    output = res.query(f'phase in @phases').pivot(
         index=['index'],
         columns=['period', 'phase'],
         values=['net_out_deg_weight_norm', 'net_out_deg_centrality']
@@ -333,18 +288,6 @@ def compute_topology_summary_table_OUT_DEGREE(data, all_phases=False, **kwargs):
 # VISUALIZATION
 
 
-def cq_to_color(cq):
-    mag = abs(cq)  # magnitude between 0 and 1
-    if cq < 0:
-        # Green: scale the green component from 0.5 (low intensity) to 1 (high intensity)
-        return f'rgba(0, {int(255 * (0.5 + 0.5 * mag))}, 0, 1)'
-    elif cq > 0:
-        # Red: scale the red component from 0.5 (low intensity) to 1 (high intensity)
-        return f'rgba({int(255 * (0.5 + 0.5 * mag))}, 0, 0, 1)'
-    else:
-        return 'gray'  # Neutral color for cq == 0
-
-
 def plot_nx_network_circular(G, ax=None, title=None, legend=True, width=1, rad=0.3):
 
 
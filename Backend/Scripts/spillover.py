@@ -54,3 +54,43 @@ def spillover_classification_advanced(row, LOW=0.10, HIGH=0.90):
 
     return 'Not-Assigned'
 
+
+
+# NOTE: VECTORIZED -> whole result tables in one call (same labels as the row functions above)
+
+def classify_spillover(data):
+    H0_rejected = data['H0_rejected'].to_numpy().astype(bool)
+    tau1, tau2, cq = (data[column].to_numpy(dtype=float) for column in ['tau1', 'tau2', 'cq'])
+
+    label = np.select(
+        [~H0_rejected, tau1 >= tau2, cq < 0],
+        ['Weak-Safe-Haven', 'Not-Assigned', 'Safe-Haven'],
+        default='Contagion'
+    )
+    return pd.Series(label, index=data.index, name='spillover')
+
+
+def classify_extreme_spillover(data, extreme_quantiles=(0.05, 0.10, 0.90, 0.95)):
+    extreme = np.isin(data['tau1'].to_numpy(dtype=float), extreme_quantiles) & np.isin(data['tau2'].to_numpy(dtype=float), extreme_quantiles)
+    return pd.Series(np.where(extreme, 'extreme', 'normal'), index=data.index, name='extreme')
+
+
+def classify_spillover_advanced(data, LOW=0.10, HIGH=0.90):
+    H0_rejected = data['H0_rejected'].to_numpy().astype(bool)
+    tau1, tau2, cq = (data[column].to_numpy(dtype=float) for column in ['tau1', 'tau2', 'cq'])
+
+    x_low   = tau1 <= LOW
+    y_low   = tau2 <= LOW
+    y_high  = tau2 >= HIGH
+
+    label = np.select(
+        [
+            ~H0_rejected & x_low & (y_low | y_high),
+            ~H0_rejected,
+            x_low & y_low & (cq > 0),
+            x_low & y_high & (cq < 0),
+        ],
+        ['Weak-Safe-Haven', 'Not-Assigned', 'Contagion', 'Safe-Haven'],
+        default='Not-Assigned'
+    )
+    return pd.Series(label, index=data.index, name='spillover')
@@ -0,0 +1,211 @@
+# NOTE: Sparse topology engine
+# NOTE: degree metrics straight from a scipy.sparse adjacency (no networkx graph objects)
+
+import numpy as np
+import pandas as pd
+
+
+def adjacency(data, nodes=None, weight='cq'):
+    '''
+    Sparse adjacency (index -> asset) of the H0-rejected rows of data, matching create_nx_network(data) with
+    `nodes` added: node set = index | asset | nodes, duplicate edges -> last row wins.
+    Returns (labels, weighted adjacency, binary adjacency).
+    '''
+    from scipy import sparse
+
+    sources = data['index'].to_numpy(dtype=object)
+    targets = data['asset'].to_numpy(dtype=object)
+
+    extra = np.asarray(list(nodes) if nodes is not None else [], dtype=object)
+    labels = pd.unique(np.concatenate([sources, targets, extra]))
+    n = len(labels)
+
+    mask = data['H0_rejected'].to_numpy().astype(bool)
+    lookup = pd.Index(labels)
+    s = lookup.get_indexer(sources[mask])
+    t = lookup.get_indexer(targets[mask])
+    w = data[weight].to_numpy(dtype=float)[mask]
+
+    # last occurrence of every (source, target) pair
+    pair = s.astype(np.int64) * n + t
+    _, last = np.unique(pair[::-1], return_index=True)
+    keep = np.sort(len(pair) - 1 - last)
+
+    A = sparse.csr_matrix((w[keep], (s[keep], t[keep])), shape=(n, n))
+    B = sparse.csr_matrix((np.ones(len(keep)), (s[keep], t[keep])), shape=(n, n))
+
+    return labels, A, B
+
+
+def degree_table(data, nodes=None, weight='cq'):
+    '''
+    Per node: weighted in / out degree (sum of cq), in / out degree and degree centralities
+    (networkx normalisation: degree / (N - 1), 1 for graphs with a single node).
+    '''
+    labels, A, B = adjacency(data, nodes=nodes, weight=weight)
+    n = len(labels)
+
+    in_degree = np.asarray(B.sum(axis=0)).ravel()
+    out_degree = np.asarray(B.sum(axis=1)).ravel()
+
+    if n > 1:
+        in_centrality, out_centrality = in_degree / (n - 1), out_degree / (n - 1)
+    else:
+        in_centrality, out_centrality = np.ones(n), np.ones(n)
+
+    return pd.DataFrame({
+        'in_weight' : np.asarray(A.sum(axis=0)).ravel(),
+        'out_weight' : np.asarray(A.sum(axis=1)).ravel(),
+        'in_degree' : in_degree,
+        'out_degree' : out_degree,
+        'in_centrality' : in_centrality,
+        'out_centrality' : out_centrality,
+    }, index=pd.Index(labels, dtype=object))
+
+
+SPILLOVER_SUFFIXES = {'Safe-Haven' : 'sh', 'Contagion' : 'cn'}
+METRICS = ['in_weight', 'out_weight', 'in_degree', 'out_degree', 'in_centrality', 'out_centrality']
+
+
+def spillover_group_degrees(data, group_cols=('period', 'phase'), nodes=None, weight='cq'):
+    '''
+    Safe-Haven / Contagion degree metrics of every group in one pass (no per-group graphs or frames).
+
+    Equivalent to looping over data.groupby(group_cols), building create_nx_network of both spillover subsets
+    (+ nodes) and collecting the metrics into a frame indexed by the Safe-Haven nodes (by the Contagion nodes
+    when the Safe-Haven network is empty). All groups share one block-diagonal sparse adjacency whose
+    rows / columns are (group, node) pairs -> degrees are its row / column sums.
+
+    Returns long frame: group_cols, 'index' (node), <metric>_sh, <metric>_cn.
+    '''
+    from scipy import sparse
+
+    group_cols = list(group_cols)
+    grouped = data.groupby(group_cols, observed=True, sort=True)
+    g = grouped.ngroup().to_numpy()
+    keys = grouped.size().index
+    G = len(keys)
+
+    sources = data['index'].to_numpy(dtype=object)
+    targets = data['asset'].to_numpy(dtype=object)
+    extra = np.asarray(list(nodes) if nodes is not None else [], dtype=object)
+
+    labels = pd.unique(np.concatenate([sources, targets, extra]))
+    n = len(labels)
+    lookup = pd.Index(labels)
+    s, t = lookup.get_indexer(sources), lookup.get_indexer(targets)
+
+    valid = g >= 0
+    h0 = data['H0_rejected'].to_numpy().astype(bool)
+    w = data[weight].to_numpy(dtype=float)
+    spillover = data['spillover'].to_numpy()
+
+    tables = {}
+    for name, suffix in SPILLOVER_SUFFIXES.items():
+        part = valid & (spillover == name)
+
+        member = np.zeros((G, n), dtype=bool)
+        member[g[part], s[part]] = True
+        member[g[part], t[part]] = True
+        if len(extra):
+            member[:, lookup.get_indexer(extra)] = True
+
+        # edges: last row of every (group, source, target)
+        rows = np.flatnonzero(part & h0)
+        pair = (g[rows].astype(np.int64) * n + s[rows]) * n + t[rows]
+        _, last = np.unique(pair[::-1], return_index=True)
+        rows = np.sort(rows[len(rows) - 1 - last])
+
+        shape = (G * n, G * n)
+        src, dst = g[rows] * n + s[rows], g[rows] * n + t[rows]
+        A = sparse.csr_matrix((w[rows], (src, dst)), shape=shape)
+        B = sparse.csr_matrix((np.ones(len(rows)), (src, dst)), shape=shape)
+
+        metrics = {
+            'in_weight' : np.asarray(A.sum(axis=0)).reshape(G, n),
+            'out_weight' : np.asarray(A.sum(axis=1)).reshape(G, n),
+            'in_degree' : np.asarray(B.sum(axis=0)).reshape(G, n),
+            'out_degree' : np.asarray(B.sum(axis=1)).reshape(G, n),
+        }
+
+        size = member.sum(axis=1).astype(float)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for direction in ['in', 'out']:
+                metrics[f'{direction}_centrality'] = np.where(size > 1, metrics[f'{direction}_degree'] / (size - 1), 1.0)
+
+        tables[suffix] = (member, metrics)
+
+    member_sh, member_cn = tables['sh'][0], tables['cn'][0]
+    row_mask = np.where(member_sh.any(axis=1)[:, None], member_sh, member_cn)
+    gi, ni = np.nonzero(row_mask)
+
+    frame = pd.DataFrame({column: keys.get_level_values(column)[gi] for column in group_cols} if len(group_cols) > 1
+                         else {group_cols[0]: keys[gi]})
+    frame['index'] = labels[ni]
+
+    for suffix, (member, metrics) in tables.items():
+        present = member[gi, ni]
+        for metric in METRICS:
+            frame[f'{metric}_{suffix}'] = np.where(present, metrics[metric][gi, ni], np.nan)
+
+    return frame
+
+
+# DENSITY
+
+CUBE_COLUMNS = ['period', 'phase', 'spillover', 'tau1', 'tau2']
+
+
+class DensityCube:
+    '''
+    Edge & node counts of every (period, phase, spillover, tau1, tau2) cell, aggregated in one grouped pass.
+        - cells: edge_n (H0-rejected rows), edge_cq_n (of which with non-null cq)
+        - nodes: distinct benchmarks per (period, phase) and per (period, phase, spillover), over all rows
+    Densities of any slice are sums over cells divided by node_n * (node_n - 1).
+    The cube is a snapshot of data: build it once after the frame is final and pass it (cube=) to every
+    density table of that frame; edits made afterwards are not reflected.
+    '''
+
+    def __init__(self, data):
+        keys = [column for column in CUBE_COLUMNS if column in data.columns]
+        self.keys = keys
+
+        h0 = data['H0_rejected'].to_numpy().astype(bool)
+        self.cells = (
+            data[h0].groupby(keys, observed=True, dropna=False)['cq']
+                .agg(edge_n='size', edge_cq_n='count')
+                .reset_index()
+        )
+
+        node_keys = [column for column in ['period', 'phase', 'spillover'] if column in keys]
+        distinct = data[node_keys + ['index']].drop_duplicates()
+        self.nodes = {}
+        for level in [node_keys[:2], node_keys]:
+            self.nodes[tuple(level)] = distinct.groupby(level, observed=True)['index'].nunique().rename('node_n')
+
+        self.total_nodes = data['index'].nunique()
+
+    def select(self, tau1=None, tau2=None):
+        mask = np.ones(len(self.cells), dtype=bool)
+        if tau1 is not None:
+            mask &= self.cells['tau1'].isin(list(tau1)).to_numpy()
+        if tau2 is not None:
+            mask &= self.cells['tau2'].isin(list(tau2)).to_numpy()
+        return self.cells[mask]
+
+    def edge_counts(self, by=('period', 'phase'), tau1=None, tau2=None, column='edge_n'):
+        '''Edge counts of the cells in tau1 x tau2 summed per `by` (groups with at least one edge row).'''
+        cells = self.select(tau1, tau2)
+        grouped = cells.groupby(list(by), observed=True)
+        counts = grouped[column].sum()
+        return counts[grouped['edge_n'].sum() > 0]
+
+    def node_counts(self, by=('period', 'phase')):
+        return self.nodes[tuple(by)]
+
+    def density(self, by=('period', 'phase'), tau1=None, tau2=None):
+        '''Density per `by` group with group-wise node counts (groups without edges -> 0).'''
+        edge_n = self.edge_counts(by, tau1, tau2).rename('edge_n')
+        node_n = self.node_counts(by)
+        dens = pd.concat([edge_n, node_n], axis=1).fillna({'edge_n' : 0})
+        return dens.assign(density=lambda d: d.edge_n / (d.node_n * (d.node_n - 1)))
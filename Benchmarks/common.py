@@ -0,0 +1,79 @@
+# NOTE: Shared benchmark fixtures & timing helpers
+# NOTE: synthetic price / result generators (offline), crisis labels & tau grid taken from the project config
+
+import os
+import sys
+import time
+
+sys.dont_write_bytecode = True
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(here))
+
+import numpy as np
+import pandas as pd
+
+from Frontend.Config.constants import TAU_SPECTRUM
+from Data.Metadata.asset_crisis_mapping import period_mapping
+
+
+PERIODS = list(period_mapping)
+PHASES = list(period_mapping[PERIODS[0]])
+
+
+def best_of(func, repeat, *args):
+    '''Best wall time of `repeat` calls + result of the last call.'''
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def synthetic_prices(assets, length, seed=0):
+    '''
+    Price history in fetch_adjusted_data layout (Date, ticker, Adj Close).
+    Returns: one common Student-t factor + idiosyncratic noise (fat tails, cross-dependence in the quantiles).
+    '''
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2015-01-01', periods=length + 1, name='Date')
+
+    factor = rng.standard_t(4, length) * 0.01
+    loadings = rng.uniform(-1.0, 1.0, assets)
+    returns = factor[:, None] * loadings[None, :] + rng.standard_t(4, (length, assets)) * 0.01
+    prices = 100 * np.exp(np.vstack([np.zeros(assets), np.cumsum(returns, axis=0)]))
+
+    return pd.DataFrame({
+        'Date' : np.tile(dates, assets),
+        'ticker' : np.repeat([f'Asset {i}' for i in range(assets)], length + 1),
+        'Adj Close' : prices.T.ravel(),
+    })
+
+
+def synthetic_results(assets, taus=TAU_SPECTRUM, seed=0, spillover=False):
+    '''Flat CQ table: periods x phases x ordered asset pairs x tau grid (optionally with spillover labels).'''
+    rng = np.random.default_rng(seed)
+    names = np.array([f'Asset {i}' for i in range(assets)])
+    benchmark, candidate = np.nonzero(~np.eye(assets, dtype=bool))
+    n_tau = len(taus)
+
+    cells = len(PERIODS) * len(PHASES) * len(benchmark)
+    pairs = np.repeat(np.arange(cells), n_tau * n_tau)
+    n = len(pairs)
+
+    data = pd.DataFrame({
+        'period' : np.repeat(PERIODS, n // len(PERIODS)),
+        'phase' : np.tile(np.repeat(PHASES, n // (len(PERIODS) * len(PHASES))), len(PERIODS)),
+        'index' : names[benchmark][pairs % len(benchmark)],
+        'asset' : names[candidate][pairs % len(benchmark)],
+        'tau1' : np.tile(np.repeat(taus, n_tau), cells),
+        'tau2' : np.tile(np.tile(taus, n_tau), cells),
+        'cq' : rng.uniform(-0.3, 0.3, n),
+        'H0_rejected' : rng.random(n) < 0.4,
+    })
+
+    if spillover:
+        from Backend.Scripts.spillover import classify_spillover
+        data['spillover'] = classify_spillover(data)
+
+    return data
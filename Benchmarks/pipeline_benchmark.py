@@ -0,0 +1,286 @@
+# NOTE: Benchmark suite: cross-quantilogram pipeline hot paths on synthetic data (fully offline)
+# NOTE: per stage -> best-of wall time, tracemalloc peak memory, throughput in pairs / s; JSON baselines for regression checks
+# usage: python Benchmarks/pipeline_benchmark.py [--assets 8] [--length 750] [--taus 0.05,0.5,0.95] [--n 200]
+#                                                [--stages compute_CQBS,...] [--save base.json] [--compare [base.json]]
+# NOTE: committed baseline (default parameters): Benchmarks/baselines/pipeline_baseline.json -> --compare without a path
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+import tracemalloc
+
+sys.dont_write_bytecode = True
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(here))
+
+import numpy as np
+import pandas as pd
+
+from common import PERIODS, PHASES, TAU_SPECTRUM, synthetic_prices, synthetic_results
+
+
+BASELINE = os.path.join(here, 'baselines', 'pipeline_baseline.json')
+
+
+def ordered_pairs(assets):
+    return assets * (assets - 1)
+
+
+# Stages
+# NOTE: stage(args, state) -> (callable, pairs); the callable is the measured part, setup stays outside
+
+def stage_load_data(args, state):
+    from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+    prices = synthetic_prices(args.assets, args.length, seed=args.seed)
+
+    def run():
+        pipeline = CQGramPipeline()
+        pipeline.load_data(prices)
+        return pipeline
+
+    return run, ordered_pairs(args.assets)
+
+
+def stage_compute_CQBS(args, state):
+    from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+    pipeline = CQGramPipeline()
+    pipeline.load_data(synthetic_prices(args.assets, args.length, seed=args.seed))
+    params = {'tau1_list' : args.taus, 'tau2_list' : args.taus, 'max_lag' : args.max_lag,
+              'n' : args.n, 'seed' : args.seed, 'verbose' : False}
+
+    def run():
+        state['store'] = pipeline.compute_CQBS(**params)
+        return state['store']
+
+    return run, len(pipeline.pair_schedule())
+
+
+def stage_compute_rolling_CQBS(args, state):
+    from Backend.Scripts.cqgram import CQGramPipeline as RollingPipeline
+    from Backend.Scripts.ETL.cqgram_etl import DataTransformer
+
+    frames = {}
+    for ticker, df in synthetic_prices(args.assets, args.length, seed=args.seed).groupby('ticker'):
+        frames[ticker] = DataTransformer.compute_log_returns(df.set_index('Date'))
+
+    pipeline = RollingPipeline(list(frames), list(frames))
+    pipeline.data = {'benchmarks' : frames, 'candidates' : frames}
+
+    def run():
+        return pipeline.compute_rolling_CQBS(window=args.window, max_lag=args.max_lag,
+                                             tau1_list=args.taus, tau2_list=args.taus, jump=args.window // 4,
+                                             n=args.n, seed=args.seed)
+
+    return run, ordered_pairs(args.assets)
+
+
+def stage_create_dataframe_from_cqgram(args, state):
+    from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+    if 'store' not in state:
+        stage_compute_CQBS(args, state)[0]()
+    store = state['store']
+
+    def run():
+        return CQGramPipeline.create_dataframe_from_cqgram(store)
+
+    return run, len({key[:2] for key in store.keys()})
+
+
+def stage_create_nx_network(args, state):
+    from Shared.graphs import create_nx_network
+
+    data = state.setdefault('results', synthetic_results(args.assets, args.taus, seed=args.seed, spillover=True))
+    subsets = [subset for _, subset in data.groupby(['period', 'phase', 'tau1', 'tau2'], sort=False)]
+
+    def run():
+        return [create_nx_network(subset) for subset in subsets]
+
+    return run, len(subsets) * ordered_pairs(args.assets)
+
+
+def stage_topology_tables(args, state):
+    from Backend.Scripts.topology import spillover_group_degrees
+
+    data = state.setdefault('results', synthetic_results(args.assets, args.taus, seed=args.seed, spillover=True))
+    subset = data[data['H0_rejected'] & data['spillover'].isin(['Safe-Haven', 'Contagion'])]
+
+    def run():
+        return spillover_group_degrees(subset, ['period', 'phase'])
+
+    return run, len(PERIODS) * len(PHASES) * ordered_pairs(args.assets)
+
+
+def stage_network_density(args, state):
+    from Backend.Scripts.topology import DensityCube
+
+    data = state.setdefault('results', synthetic_results(args.assets, args.taus, seed=args.seed, spillover=True))
+    low, high = min(args.taus), max(args.taus)
+
+    def run():
+        cube = DensityCube(data)
+        return cube.density(('period', 'phase'), tau1=[low], tau2=[low, high])
+
+    return run, len(PERIODS) * len(PHASES) * ordered_pairs(args.assets)
+
+
+STAGES = {
+    'load_data' : stage_load_data,
+    'compute_CQBS' : stage_compute_CQBS,
+    'compute_rolling_CQBS' : stage_compute_rolling_CQBS,
+    'create_dataframe_from_cqgram' : stage_create_dataframe_from_cqgram,
+    'create_nx_network' : stage_create_nx_network,
+    'topology_tables' : stage_topology_tables,
+    'network_density' : stage_network_density,
+}
+
+
+# Measurement
+
+def measure(run, repeat):
+    '''Best-of wall time over `repeat` runs + tracemalloc peak of one extra (traced) run.'''
+    # NOTE: warm-up -> lazy imports & first-call caches are not timed
+    run()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), peak
+
+
+def run_suite(args):
+    state = {}
+    stages = {}
+
+    for name in args.stages:
+        try:
+            run, pairs = STAGES[name](args, state)
+        except ImportError as e:
+            # NOTE: optional dependency of a stage missing (e.g. plotting stack of Scripts/cqgram.py) -> reported, not fatal
+            print(f'{name:30s} skipped ({e})')
+            continue
+
+        wall, peak = measure(run, args.repeat)
+        stages[name] = {'wall_s' : wall, 'peak_mb' : peak / 2**20, 'pairs' : pairs, 'pairs_per_s' : pairs / wall if wall > 0 else float('inf')}
+
+        print(f"{name:30s} {wall:9.4f} s | peak {stages[name]['peak_mb']:9.1f} MB | {stages[name]['pairs_per_s']:12.1f} pairs/s ({pairs} pairs)")
+
+    return stages
+
+
+def parameters(args):
+    return {
+        'assets' : args.assets, 'length' : args.length, 'taus' : args.taus, 'n' : args.n,
+        'max_lag' : args.max_lag, 'window' : args.window, 'seed' : args.seed,
+    }
+
+
+def environment():
+    return {
+        'python' : platform.python_version(),
+        'numpy' : np.__version__,
+        'pandas' : pd.__version__,
+        'machine' : platform.platform(),
+        'cpus' : os.cpu_count(),
+    }
+
+
+def save_baseline(path, args, stages):
+    baseline = {
+        'created' : datetime.datetime.now().isoformat(timespec='seconds'),
+        'parameters' : parameters(args),
+        'environment' : environment(),
+        'stages' : stages,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=4)
+
+
+def compare_baseline(path, args, stages, tolerance):
+    '''Regressions: stages slower (wall time) or heavier (peak memory) than the baseline by more than tolerance.'''
+    with open(path) as f:
+        baseline = json.load(f)
+
+    if baseline['parameters'] != parameters(args):
+        print(f"baseline parameters differ -> not comparable: {baseline['parameters']}")
+        return []
+
+    if baseline.get('environment', {}) != environment():
+        print(f"WARNING: baseline recorded in a different environment: {baseline.get('environment')}")
+
+    regressions = []
+    print(f"\n{'stage':30s} {'wall':>9s} {'baseline':>9s} {'ratio':>7s} | {'peak':>9s} {'baseline':>9s} {'ratio':>7s}")
+    for name, current in stages.items():
+        if name not in baseline['stages']:
+            continue
+        base = baseline['stages'][name]
+
+        wall_ratio = current['wall_s'] / base['wall_s'] if base['wall_s'] > 0 else float('inf')
+        peak_ratio = current['peak_mb'] / base['peak_mb'] if base['peak_mb'] > 0 else 1.0
+
+        flags = []
+        if wall_ratio > 1 + tolerance:
+            flags.append('TIME')
+        if peak_ratio > 1 + tolerance:
+            flags.append('MEMORY')
+        if flags:
+            regressions.append((name, flags))
+
+        print(f"{name:30s} {current['wall_s']:9.4f} {base['wall_s']:9.4f} {wall_ratio:7.2f} | "
+              f"{current['peak_mb']:9.1f} {base['peak_mb']:9.1f} {peak_ratio:7.2f} {' '.join(flags)}")
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--assets', type=int, default=8)
+    parser.add_argument('--length', type=int, default=750, help='observations per series')
+    parser.add_argument('--taus', type=lambda value: [float(tau) for tau in value.split(',')], default=TAU_SPECTRUM)
+    parser.add_argument('--n', type=int, default=200, help='bootstrap resamples')
+    parser.add_argument('--max-lag', dest='max_lag', type=int, default=1)
+    parser.add_argument('--window', type=int, default=250, help='rolling window length')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stages', type=lambda value: value.split(','), default=list(STAGES))
+    parser.add_argument('--save', default=None, help='write results as JSON baseline')
+    parser.add_argument('--compare', nargs='?', const=BASELINE, default=None,
+                        help=f'compare against a JSON baseline (default: {os.path.relpath(BASELINE)}; exit code 1 on regression)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown / memory growth')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f'unknown stages: {unknown} (available: {list(STAGES)})')
+
+    print(f'assets: {args.assets} | length: {args.length} | taus: {len(args.taus)} | bootstrap: {args.n} | max_lag: {args.max_lag}')
+    stages = run_suite(args)
+
+    if args.save:
+        save_baseline(args.save, args, stages)
+        print(f'baseline saved: {args.save}')
+
+    if args.compare:
+        regressions = compare_baseline(args.compare, args, stages, args.tolerance)
+        if regressions:
+            print(f'regressions: {regressions}')
+            sys.exit(1)
@@ -0,0 +1,43 @@
+# NOTE: Micro-benchmark: spillover classification
+# NOTE: row-wise DataFrame.apply(axis=1) classifiers vs vectorized np.select classifiers on a multi-crisis result table
+# usage: python Benchmarks/spillover_benchmark.py [--assets 17] [--repeat 3]
+
+import os
+import sys
+import argparse
+
+sys.dont_write_bytecode = True
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(here))
+
+from common import PERIODS, PHASES, TAU_SPECTRUM, best_of, synthetic_results
+from Backend.Scripts.spillover import (
+    spillover_classification, spillover_classification_advanced, extreme_spillover_classification,
+    classify_spillover, classify_spillover_advanced, classify_extreme_spillover,
+)
+
+
+CASES = [
+    ('spillover_classification', lambda data: data.apply(spillover_classification, axis=1), classify_spillover),
+    ('spillover_classification_advanced', lambda data: data.apply(spillover_classification_advanced, axis=1), classify_spillover_advanced),
+    ('extreme_spillover_classification', lambda data: data.apply(extreme_spillover_classification, axis=1), classify_extreme_spillover),
+]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--assets', type=int, default=17)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data = synthetic_results(args.assets)
+    print(f'rows: {len(data)} ({len(PERIODS)} periods x {len(PHASES)} phases x {args.assets} assets x {len(TAU_SPECTRUM)}^2 taus)')
+
+    for name, rowwise, vectorized in CASES:
+        t_rowwise, expected = best_of(rowwise, 1, data)
+        t_vectorized, result = best_of(vectorized, args.repeat, data)
+
+        # sanity: identical labels
+        assert (expected.to_numpy() == result.to_numpy()).all()
+
+        print(f'{name:36s} row-wise {t_rowwise:8.3f} s | vectorized {t_vectorized:8.4f} s | {t_rowwise / t_vectorized:8.1f}x')
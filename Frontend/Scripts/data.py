@@ -2,10 +2,138 @@
 # NOTE: used for loading data & metadata mapping
 
 import os
+import glob
+import threading
 import numpy as np
 import pandas as pd
 
-
+from Shared.dimensions import AssetDimension
+
+
+# NOTE: dtype schema of the CQ dataset -> categoricals for labels, float32 for displayed statistics
+# NOTE: tau1 / tau2 stay float64 (filtered by equality with float(input) values)
+CATEGORY_COLUMNS = ['period', 'phase', 'index', 'asset', 'name_benchmark', 'name_candidate',
+                    'selection', 'source', 'file', 'spillover', 'date_start', 'date_end']
+FLOAT32_COLUMNS  = ['cq', 'cq_upper', 'cq_lower', 'q', 'qc']
+INT_COLUMNS      = ['lag', 'max_lag']
+BOOL_COLUMNS     = ['H0_rejected', 'stationarity_satisfied']
+
+CATEGORY_RATIO = 0.5
+
+_DATA_CACHE = {}
+_INDEX_CACHE = {}
+_DATA_LOCK = threading.Lock()
+
+
+def optimize_dtypes(data):
+    '''Applies the CQ dtype schema; other low-cardinality string columns become categoricals as well.'''
+    for column in data.columns:
+        if column in FLOAT32_COLUMNS:
+            data[column] = data[column].astype(np.float32)
+        elif column in INT_COLUMNS:
+            data[column] = pd.to_numeric(data[column], downcast='integer')
+        elif column in BOOL_COLUMNS and data[column].notna().all():
+            data[column] = data[column].astype(bool)
+        elif column in CATEGORY_COLUMNS:
+            data[column] = data[column].astype('category')
+        elif pd.api.types.is_string_dtype(data[column]) and data[column].nunique() < CATEGORY_RATIO * len(data):
+            data[column] = data[column].astype('category')
+    return data
+
+
+def sidecar_path(path):
+    directory, file = os.path.split(path)
+    return os.path.join(directory, f'.{file}.{os.stat(path).st_mtime_ns}.parquet')
+
+
+def load_cq_data(path, sidecar=True):
+    '''
+    Typed load of the CQ results CSV.
+    The converted frame is cached next to the CSV as a Parquet sidecar keyed by the CSV mtime -> later loads
+    skip CSV parsing & dtype inference (stale sidecars are removed).
+    '''
+    cached = sidecar_path(path) if sidecar else None
+    if cached is not None and os.path.exists(cached):
+        try:
+            return pd.read_parquet(cached)
+        except (ImportError, OSError, ValueError):
+            pass
+
+    dtypes = {column: 'category' for column in CATEGORY_COLUMNS}
+    dtypes.update({column: np.float32 for column in FLOAT32_COLUMNS})
+    header = pd.read_csv(path, nrows=0).columns
+    data = pd.read_csv(path, dtype={column: dtype for column, dtype in dtypes.items() if column in header})
+    data = optimize_dtypes(data)
+
+    if cached is not None:
+        directory, file = os.path.split(path)
+        for stale in glob.glob(os.path.join(glob.escape(directory), f'.{glob.escape(file)}.*.parquet')):
+            if stale != cached:
+                # NOTE: read-only dir / concurrent worker already removed it -> keep serving the CSV frame
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+        try:
+            data.to_parquet(cached, index=False)
+        except (ImportError, OSError, ValueError):
+            pass
+
+    return data
+
+
+def get_cq_data(path, sidecar=True):
+    '''Process-wide lazy load: the dataset is read on first use and shared by all sessions.'''
+    with _DATA_LOCK:
+        if path not in _DATA_CACHE:
+            _DATA_CACHE[path] = load_cq_data(path, sidecar=sidecar)
+        return _DATA_CACHE[path]
+
+
+def get_subset_index(path, sidecar=True):
+    '''Process-wide SubsetIndex of the dataset at path (built once, after the first load).'''
+    data = get_cq_data(path, sidecar=sidecar)
+    with _DATA_LOCK:
+        if path not in _INDEX_CACHE:
+            _INDEX_CACHE[path] = SubsetIndex(data)
+        return _INDEX_CACHE[path]
+
+
+class SubsetIndex:
+    '''
+    Row positions of the dataset per (period, phase, tau1, tau2) and per (period, phase), built in one groupby pass.
+    Lookups return rows in their original order (same result as the equivalent query chain).
+    '''
+
+    KEYS = ['period', 'phase', 'tau1', 'tau2']
+
+    def __init__(self, data):
+        self.data = data
+
+        self.positions = {
+            key: positions
+            for key, positions in data.groupby(self.KEYS, observed=True, sort=False).indices.items()
+        }
+        self.phase_positions = {
+            key: positions
+            for key, positions in data.groupby(self.KEYS[:2], observed=True, sort=False).indices.items()
+        }
+
+        self.empty = np.empty(0, dtype=np.intp)
+
+    def rows(self, keys):
+        parts = [self.positions[key] for key in dict.fromkeys(keys) if key in self.positions]
+        if not parts:
+            return self.empty
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def select(self, period, phase, tau1=None, tau2_list=None):
+        '''Rows of (period, phase); optionally restricted to tau1 == tau1 and tau2 in tau2_list.'''
+        if tau1 is None:
+            positions = self.phase_positions.get((period, phase), self.empty)
+        else:
+            positions = self.rows([(period, phase, tau1, tau2) for tau2 in tau2_list])
+        return self.data.iloc[positions]
 
 
 def select_period(data, period):
@@ -16,10 +144,21 @@ def select_phase(data, phase='full_period'):
     return data.query(f"phase == '{phase}'")
 
 
-def map_metadata(data, metadata):
-    df_1 = pd.merge(data, metadata, left_on='index', right_on='name')
-    df_2 = pd.merge(df_1, metadata, left_on='asset', right_on='name', suffixes=('_benchmark', '_candidate'))
-    return df_2
+def map_metadata(data, metadata, categorical=False):
+    '''
+    Inner join of benchmark (index) & candidate (asset) metadata with _benchmark / _candidate columns,
+    resolved through an AssetDimension (codes instead of two hash joins).
+    categorical: index / asset & metadata columns kept as codes into the dimension
+    '''
+    if metadata['name'].dropna().duplicated().any():
+        df_1 = pd.merge(data, metadata, left_on='index', right_on='name')
+        df_2 = pd.merge(df_1, metadata, left_on='asset', right_on='name', suffixes=('_benchmark', '_candidate'))
+        return df_2
+
+    names = {key: {column: f'{column}{suffix}' for column in metadata.columns}
+             for key, suffix in [('index', '_benchmark'), ('asset', '_candidate')]}
+    dimension = AssetDimension.for_data(metadata, data) if categorical else AssetDimension(metadata)
+    return dimension.attach(data, names, how='inner', categorical=categorical)
 
 
 def map_period_timestamps(data, metadata, how='left'):
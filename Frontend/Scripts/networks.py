@@ -7,33 +7,9 @@ import json
 import matplotlib.colors as mcolors
 from pyvis.network import Network
 
+from Shared.graphs import cq_to_color, cq_to_colors, create_nx_network
 
 
-def cq_to_color(cq):
-    mag = abs(cq)  # magnitude between 0 and 1
-    if cq < 0:
-        # Green: scale the green component from 0.5 (low intensity) to 1 (high intensity)
-        return f'rgba(0, {int(255 * (0.5 + 0.5 * mag))}, 0, 1)'
-    elif cq > 0:
-        # Red: scale the red component from 0.5 (low intensity) to 1 (high intensity)
-        return f'rgba({int(255 * (0.5 + 0.5 * mag))}, 0, 0, 1)'
-    else:
-        return 'gray'  # Neutral color for cq == 0
-
-
-def create_nx_network(data, width_factor=1):
-    import networkx as nx
-    G = nx.DiGraph()
-    nodes = set(data['index']) | set(data['asset'])
-    G.add_nodes_from(nodes)
-    for _, row in data.iterrows():
-        if row['H0_rejected']:
-            width = abs(row['cq']) * width_factor
-            color = cq_to_color(row['cq'])
-            G.add_edge(row['index'], row['asset'], cq=row['cq'], tau1=row['tau1'], tau2=row['tau2'], width=width, color=color)
-    
-    return G
-
 
 def create_network(subset):
     return create_nx_network(subset)
@@ -0,0 +1,81 @@
+# NOTE: Asset dimension table shared by the backend loaders & the frontend metadata mapping
+# NOTE: neutral module -> neither layer imports the other (repo root on sys.path, like Data.Metadata)
+
+import numpy as np
+import pandas as pd
+
+
+class AssetDimension:
+    '''
+    Asset dimension table: one row of metadata per asset label (metadata['name']).
+    Result rows reference it through integer codes of index / asset (shared CategoricalDtype) and metadata
+    columns are resolved per code -> O(rows) take, no hash join, no per-row copies of the metadata strings.
+    '''
+
+    def __init__(self, metadata, labels=()):
+        names = metadata['name']
+        if names.dropna().duplicated().any():
+            raise ValueError('Asset metadata names must be unique.')
+
+        known = pd.Index(names.dropna().unique())
+        self.dtype = pd.CategoricalDtype(known.append(pd.Index(labels).difference(known, sort=False).dropna()))
+
+        self.metadata = metadata.reset_index(drop=True)
+        self.rows = pd.Index(names.to_numpy()).get_indexer(self.dtype.categories)     # category -> metadata row (-1: unknown)
+        self._columns = {}
+
+    @classmethod
+    def for_data(cls, metadata, data):
+        '''Dimension covering every index / asset label of data (labels without metadata included).'''
+        labels = pd.Index(pd.unique(data['index'])).append(pd.Index(pd.unique(data['asset']))).unique()
+        return cls(metadata, labels=labels)
+
+    def encode(self, values):
+        '''Codes of labels in the dimension (-1: missing).'''
+        if isinstance(values.dtype, pd.CategoricalDtype) and values.dtype == self.dtype:
+            return values.cat.codes.to_numpy()
+        codes, uniques = pd.factorize(values)
+        return np.where(codes >= 0, self.dtype.categories.get_indexer(uniques)[codes], -1)
+
+    def column_codes(self, column):
+        '''(values, code per category) of a metadata column, built once per column.'''
+        if column not in self._columns:
+            codes, values = pd.factorize(self.metadata[column])
+            self._columns[column] = (values, np.where(self.rows >= 0, codes[self.rows], -1))
+        return self._columns[column]
+
+    def resolve(self, codes, column, categorical=True):
+        '''Metadata column for rows given by their codes (missing asset / value -> NaN).'''
+        if categorical:
+            values, category_codes = self.column_codes(column)
+            return pd.Categorical.from_codes(np.where(codes >= 0, category_codes[codes], -1), categories=values)
+        per_category = self.metadata[column].reindex(self.rows).array
+        return per_category.take(codes, allow_fill=True)
+
+    def attach(self, data, names, how='left', before=None, categorical=True):
+        '''
+        Adds metadata columns of the benchmark (index) & candidate (asset).
+            - names: {'index' : {column: output name}, 'asset' : {column: output name}}
+            - how: 'left' keeps all rows, 'inner' drops rows whose index or asset has no metadata
+            - categorical: metadata & index / asset columns as categoricals (codes) instead of materialised strings
+        '''
+        codes = {key: self.encode(data[key]) for key in names}
+
+        if how == 'inner':
+            keep = np.logical_and.reduce([(code >= 0) & (self.rows[code] >= 0) for code in codes.values()])
+            data = data[keep].reset_index(drop=True)
+            codes = {key: code[keep] for key, code in codes.items()}
+
+        mapped = {}
+        for key, columns in names.items():
+            for column, name in columns.items():
+                mapped[name] = self.resolve(codes[key], column, categorical=categorical)
+
+        if categorical:
+            data = data.copy()
+            for key, code in codes.items():
+                data[key] = pd.Categorical.from_codes(code, dtype=self.dtype)
+
+        position = data.columns.get_loc(before) if before is not None and before in data.columns else len(data.columns)
+        mapped = pd.DataFrame(mapped, index=data.index)
+        return pd.concat([data.iloc[:, :position], mapped, data.iloc[:, position:]], axis=1)
@@ -0,0 +1,81 @@
+# NOTE: Shared network construction (backend topology & frontend network page)
+# NOTE: neutral module -> neither layer imports the other (repo root on sys.path, like Data.Metadata)
+# NOTE: masks & arrays instead of iterrows -> edges added to the DiGraph in bulk
+
+import numpy as np
+import pandas as pd
+
+
+# NOTE: colour strings per intensity level (int(255 * (0.5 + 0.5 * |cq|)) -> 127..255 for |cq| <= 1)
+_RED   = np.array([f'rgba({level}, 0, 0, 1)' for level in range(256)], dtype=object)
+_GREEN = np.array([f'rgba(0, {level}, 0, 1)' for level in range(256)], dtype=object)
+
+
+def cq_to_color(cq):
+    mag = abs(cq)  # magnitude between 0 and 1
+    if cq < 0:
+        # Green: scale the green component from 0.5 (low intensity) to 1 (high intensity)
+        return f'rgba(0, {int(255 * (0.5 + 0.5 * mag))}, 0, 1)'
+    elif cq > 0:
+        # Red: scale the red component from 0.5 (low intensity) to 1 (high intensity)
+        return f'rgba({int(255 * (0.5 + 0.5 * mag))}, 0, 0, 1)'
+    else:
+        return 'gray'  # Neutral color for cq == 0
+
+
+def cq_to_colors(cq):
+    '''Vectorized cq_to_color -> object array of colour strings.'''
+    cq = np.asarray(cq, dtype=float)
+    colors = np.full(cq.shape, 'gray', dtype=object)
+
+    neg, pos = cq < 0, cq > 0
+    levels = (255 * (0.5 + 0.5 * np.abs(np.nan_to_num(cq)))).astype(np.int64)
+
+    if levels[neg | pos].max(initial=0) > 255:
+        colors[neg | pos] = [cq_to_color(value) for value in cq[neg | pos]]
+        return colors
+
+    colors[neg] = _GREEN[levels[neg]]
+    colors[pos] = _RED[levels[pos]]
+
+    return colors
+
+
+def edge_arrays(data, width_factor=1):
+    '''Edges of the H0-rejected rows as arrays (row order kept): source, target, cq, tau1, tau2, width, color.'''
+    mask = data['H0_rejected'].to_numpy().astype(bool)
+
+    cq = data['cq'].to_numpy(dtype=float)[mask]
+
+    return {
+        'source' : data['index'].to_numpy()[mask],
+        'target' : data['asset'].to_numpy()[mask],
+        'cq' : cq,
+        'tau1' : data['tau1'].to_numpy()[mask],
+        'tau2' : data['tau2'].to_numpy()[mask],
+        'width' : np.abs(cq) * width_factor,
+        'color' : cq_to_colors(cq),
+    }
+
+
+def create_nx_network(data, width_factor=1):
+    '''
+    DiGraph of significant spillovers (index -> asset) with cq, tau1, tau2, width & color edge attributes.
+    Duplicate (index, asset) rows: the last one wins, as with sequential add_edge.
+    '''
+    import networkx as nx
+
+    G = nx.DiGraph()
+    nodes = set(data['index']) | set(data['asset'])
+    G.add_nodes_from(nodes)
+
+    edges = edge_arrays(data, width_factor=width_factor)
+    G.add_edges_from(
+        (source, target, {'cq' : cq, 'tau1' : tau1, 'tau2' : tau2, 'width' : width, 'color' : color})
+        for source, target, cq, tau1, tau2, width, color in zip(
+            edges['source'], edges['target'], edges['cq'].tolist(), edges['tau1'].tolist(),
+            edges['tau2'].tolist(), edges['width'].tolist(), edges['color']
+        )
+    )
+
+    return G
@@ -31,7 +31,10 @@ from Frontend.Scripts.data import *
 
 # data load
 
-data = pd.read_csv(CQ_DATA_DIR_PATH + '/' + CQ_DATA_FILE_PATH)
+# NOTE: lazy, typed & shared across sessions (first access reads the CSV or its Parquet sidecar)
+# NOTE: reactive filters are lookups into the prebuilt (period, phase, tau1, tau2) index
+def get_index():
+    return get_subset_index(os.path.join(CQ_DATA_DIR_PATH, CQ_DATA_FILE_PATH))
 
 
 # APPLICATION PART
@@ -197,13 +200,10 @@ def filter_data_heatmaps():
     period = PERIOD_BACKEND_MAPPING.get(period, '')
     phase = PHASE_BACKEND_MAPPING.get(phase, '')
 
-    subset = (
-        data.pipe(select_period, period)
-        .pipe(select_phase, phase)
-    )
+    subset = get_index().select(period, phase)
 
     if input.radio_markets_only_heatmaps() == '2':
-        subset = subset.query(f'name_benchmark in ({MARKETS})')
+        subset = subset[subset['name_benchmark'].isin(MARKETS)]
 
     return subset
 
@@ -222,12 +222,7 @@ def filter_data_networks():
     period = PERIOD_BACKEND_MAPPING.get(period, '')
     phase = PHASE_BACKEND_MAPPING.get(phase, '')
 
-    subset = (
-        data.pipe(select_period, period)
-        .pipe(select_phase, phase)
-    )
-
-    subset = subset.query('tau1 == @tau1 and tau2 in (@tau1, @tau2)')
+    subset = get_index().select(period, phase, tau1=tau1, tau2_list=(tau1, tau2))
 
     return subset
 
@@ -0,0 +1,42 @@
+# NOTE: Shared test fixtures: repo root on sys.path, synthetic returns & prices (fully offline)
+
+import os
+import sys
+
+sys.dont_write_bytecode = True
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+TAUS = [0.05, 0.5, 0.95]
+
+
+def synthetic_returns(length, seed=0):
+    '''Pair of cross-dependent fat-tailed return series (x2 leads x1 by one observation).'''
+    rng = np.random.default_rng(seed)
+    x2 = rng.standard_t(4, length) * 0.01
+    x1 = 0.5 * np.roll(x2, 1) + rng.standard_t(4, length) * 0.01
+    return x1, x2
+
+
+def synthetic_prices(assets=3, length=300, seed=0, start='2020-01-01'):
+    '''Price history in fetch_adjusted_data layout (Date, ticker, Adj Close).'''
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=length, name='Date')
+    return pd.concat([
+        pd.DataFrame({'Date' : dates, 'Adj Close' : 100 * np.exp(np.cumsum(rng.standard_t(4, length) * 0.01)), 'ticker' : f'Asset {i}'})
+        for i in range(assets)
+    ], ignore_index=True)
+
+
+@pytest.fixture
+def returns():
+    return synthetic_returns(400)
+
+
+@pytest.fixture
+def prices():
+    return synthetic_prices()
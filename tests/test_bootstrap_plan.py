@@ -0,0 +1,74 @@
+# NOTE: Shared bootstrap plan: reproducible resamples, bounded index cache, identical serial / process runs
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import TAUS, synthetic_prices
+from Backend.Scripts.ETL.cqgram_engine import BootstrapPlan, batched_CQBS, bootstrap_statistics
+
+
+def test_indices_depend_on_seed_and_length_only():
+    plan = BootstrapPlan(n=30, seed=7)
+
+    first = plan.indices(200)
+    assert first.shape == (30, 200)
+    assert plan.indices(200) is first
+
+    np.testing.assert_array_equal(BootstrapPlan(n=30, seed=7).indices(200), first)
+    assert not np.array_equal(BootstrapPlan(n=30, seed=8).indices(200), first)
+    assert not np.array_equal(plan.indices(201)[:, :200], first)
+
+
+def test_index_cache_is_bounded_lru():
+    plan = BootstrapPlan(n=5, seed=0, max_entries=3)
+
+    expected = {T: plan.indices(T).copy() for T in range(50, 55)}
+    assert len(plan.cache) == 3
+    assert [key[0] for key in plan.cache] == [52, 53, 54]
+
+    # NOTE: hit moves the length to the most recent end, evicted lengths are regenerated identically
+    plan.indices(52)
+    plan.indices(50)
+    assert [key[0] for key in plan.cache] == [54, 52, 50]
+    for T, indices in expected.items():
+        np.testing.assert_array_equal(plan.indices(T), indices)
+
+
+def test_pickled_plan_ships_without_cache():
+    plan = BootstrapPlan(n=10, seed=3)
+    indices = plan.indices(120)
+
+    shipped = pickle.loads(pickle.dumps(plan))
+    assert len(shipped.cache) == 0
+    np.testing.assert_array_equal(shipped.indices(120), indices)
+
+
+def test_plan_resamples_used_by_batched_CQBS(returns):
+    x1, x2 = returns
+    plan = BootstrapPlan(n=40, seed=11)
+
+    grid = batched_CQBS(x1, TAUS, x2, TAUS, k=2, bootstrap_plan=plan)
+    stats = bootstrap_statistics(x1, TAUS, x2, TAUS, grid['cq'], plan.indices(len(x1)))
+
+    for column, values in stats.items():
+        np.testing.assert_array_equal(grid[column], values)
+
+
+def test_serial_and_process_runs_are_identical():
+    from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+    data = synthetic_prices(assets=4, length=250)
+    params = {'tau1_list' : TAUS, 'tau2_list' : TAUS, 'max_lag' : 2, 'n' : 50, 'seed' : 42, 'verbose' : False}
+
+    outputs = []
+    for executor in [None, 'process']:
+        pipeline = CQGramPipeline()
+        pipeline.load_data(data)
+        outputs.append(pipeline.compute_CQBS(executor=executor, workers=2, **params))
+
+    serial, parallel = outputs
+    assert list(serial) == list(parallel)
+    pd.testing.assert_frame_equal(serial.to_pandas(categorical=False), parallel.to_pandas(categorical=False))
@@ -0,0 +1,76 @@
+# NOTE: Crisis batch runner vs one compute_CQBS run per (period, phase) window
+
+import pandas as pd
+import pytest
+
+from conftest import TAUS, synthetic_prices
+
+from Backend.Scripts.ETL.cqgram_batch import CrisisBatchRunner
+from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+
+PERIOD_MAPPING = {
+    'A' : {'full_period' : ('2020-01-01', '2020-08-31'), 'phase_I' : ('2020-01-01', '2020-04-30'), 'phase_II' : ('2020-05-01', '2020-08-31')},
+    'B' : {'full_period' : ('2020-09-01', '2020-12-31')},
+}
+PARAMS = {'tau1_list' : TAUS, 'tau2_list' : TAUS, 'max_lag' : 2, 'n' : 30, 'seed' : 5, 'verbose' : False}
+
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic_prices(assets=3, length=300, start='2019-12-02')
+
+
+def test_windows_and_history_range():
+    runner = CrisisBatchRunner({}, PERIOD_MAPPING, buffer_days=10)
+    assert [window[:2] for window in runner.windows()] == [('A', 'full_period'), ('A', 'phase_I'), ('A', 'phase_II'), ('B', 'full_period')]
+    assert runner.history_range() == ('2019-12-22', '2020-12-31')
+
+
+@pytest.mark.parametrize('executor', [None, 'process'])
+def test_batch_matches_per_window_runs(data, executor):
+    runner = CrisisBatchRunner({}, PERIOD_MAPPING).load(data)
+    results = runner.run(executor=executor, workers=2, **PARAMS)
+
+    assert list(results) == [window[:2] for window in runner.windows()]
+    for period, phase, start, end in runner.windows():
+        pipeline = CQGramPipeline()
+        pipeline.load_data(data)
+        expected = pipeline.compute_CQBS(start=start, end=end, **PARAMS)
+
+        assert list(results[(period, phase)]) == list(expected)
+        pd.testing.assert_frame_equal(results[(period, phase)].to_pandas(categorical=False), expected.to_pandas(categorical=False))
+
+
+def test_batch_writes_every_window(data, tmp_path):
+    pytest.importorskip('pyarrow')
+
+    progress = []
+    runner = CrisisBatchRunner({}, PERIOD_MAPPING).load(data)
+    runner.run(output_dir=str(tmp_path), progress=lambda done, total: progress.append((done, total)), **PARAMS)
+
+    expected = runner.to_pandas()
+    loaded = CQGramPipeline.load_results(str(tmp_path))
+
+    key = ['period', 'phase', 'index', 'asset', 'tau2', 'tau1', 'lag']
+    assert len(loaded) == len(expected)
+    assert set(map(tuple, loaded[key].astype(str).to_numpy())) == set(map(tuple, expected[key].astype(str).to_numpy()))
+    assert progress[-1] == (len(progress), 4 * 6)
+
+
+def test_windows_without_enough_data_are_empty(data):
+    mapping = PERIOD_MAPPING | {'C' : {'full_period' : ('2022-01-01', '2022-06-30')}}
+    runner = CrisisBatchRunner({}, mapping).load(data)
+    results = runner.run(min_obs=20, **PARAMS)
+
+    assert len(results[('C', 'full_period')]) == 0
+    assert len(results[('B', 'full_period')]) == 6 * len(TAUS) ** 2
+
+
+def test_pair_tasks_skip_short_pairs(data):
+    pipeline = CQGramPipeline()
+    # NOTE: Asset 2 stops trading early -> no overlap with the requested window
+    pipeline.load_data(data[(data['ticker'] != 'Asset 2') | (data['Date'] < '2020-03-01')])
+
+    tasks = pipeline.pair_tasks(tau1_list=TAUS, tau2_list=TAUS, start='2020-05-01', end='2020-08-31', min_obs=10)
+    assert {(task[1], task[2]) for task in tasks} == {('Asset 0', 'Asset 1'), ('Asset 1', 'Asset 0')}
@@ -0,0 +1,84 @@
+# NOTE: Batched Cross-Quantilogram engine vs per-(tau1, tau2, lag) reference computations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import TAUS, synthetic_prices
+from Backend.Scripts.ETL.cqgram_engine import (
+    CQBS_COLUMNS, batched_CQBS, cross_quantilogram, portmanteau, quantile_hits, stationary_bootstrap_indices,
+)
+
+
+def reference_cq(x1, tau1, x2, tau2, k):
+    '''Cross-Quantilogram of x1 against x2 lagged by k, straight from the definition.'''
+    psi1 = (x1 < np.quantile(x1, tau1)) - tau1
+    psi2 = (x2 < np.quantile(x2, tau2)) - tau2
+    a, b = psi1[k:], psi2[:-k]
+    return np.sum(a * b) / np.sqrt(np.sum(a * a) * np.sum(b * b))
+
+
+def test_batched_cq_matches_definition(returns):
+    x1, x2 = returns
+    grid = batched_CQBS(x1, TAUS, x2, TAUS, k=3, n=20, rng=np.random.default_rng(0))
+
+    assert set(CQBS_COLUMNS) <= set(grid)
+    assert grid['cq'].shape == (len(TAUS), len(TAUS), 3)
+
+    for i, tau1 in enumerate(TAUS):
+        for j, tau2 in enumerate(TAUS):
+            expected = [reference_cq(x1, tau1, x2, tau2, k) for k in range(1, 4)]
+            np.testing.assert_allclose(grid['cq'][i, j], expected, rtol=1e-10, atol=1e-12)
+
+            T = len(x1)
+            q = T * (T + 2) * np.cumsum(np.square(expected) / (T - np.arange(1, 4)))
+            np.testing.assert_allclose(grid['q'][i, j], q, rtol=1e-10, atol=1e-12)
+
+
+def test_batched_bootstrap_matches_resample_loop(returns):
+    x1, x2 = returns
+    T, n = len(x1), 50
+    grid = batched_CQBS(x1, TAUS, x2, TAUS, k=2, n=n, rng=np.random.default_rng(1), batch_size=16)
+
+    indices = stationary_bootstrap_indices(T, n, rng=np.random.default_rng(1))
+    deviation = np.stack([
+        cross_quantilogram(quantile_hits(x1[idx], TAUS), quantile_hits(x2[idx], TAUS), 2)[0] for idx in indices
+    ]) - grid['cq'][None]
+
+    np.testing.assert_allclose(grid['cq_upper'], np.nanquantile(deviation, 0.975, axis=0))
+    np.testing.assert_allclose(grid['cq_lower'], np.nanquantile(deviation, 0.025, axis=0))
+    np.testing.assert_allclose(grid['qc'], np.nanquantile(portmanteau(deviation, T), 0.95, axis=0))
+
+
+def test_batched_CQBS_matches_CrossQuantilogram(returns):
+    cq = pytest.importorskip('CrossQuantilogram')
+
+    x1, x2 = returns
+    grid = batched_CQBS(x1, TAUS, x2, TAUS, k=2, n=20, rng=np.random.default_rng(0))
+
+    for i, tau1 in enumerate(TAUS):
+        for j, tau2 in enumerate(TAUS):
+            result = cq.CQBS(pd.Series(x1), tau1, pd.Series(x2), tau2, k=2, verbose=False, n=20)
+            np.testing.assert_allclose(grid['cq'][i, j], result['cq'].to_numpy(dtype=float), rtol=1e-10, atol=1e-12)
+            np.testing.assert_allclose(grid['q'][i, j], result['q'].to_numpy(dtype=float), rtol=1e-10, atol=1e-12)
+
+
+def test_pipeline_engines_agree():
+    pytest.importorskip('CrossQuantilogram')
+    from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+    data = synthetic_prices(assets=3, length=250)
+    params = {'tau1_list' : TAUS, 'tau2_list' : TAUS, 'max_lag' : 2, 'n' : 20, 'verbose' : False}
+
+    outputs = {}
+    for engine in ['batched', 'cq']:
+        pipeline = CQGramPipeline({'engine' : engine, 'normalize_significance' : False})
+        pipeline.load_data(data)
+        outputs[engine] = pipeline.compute_CQBS(**params)
+
+    assert set(outputs['batched']) == set(outputs['cq'])
+    for key, expected in outputs['cq'].items():
+        result = outputs['batched'][key]
+        np.testing.assert_allclose(result['cq'].to_numpy(), expected['cq'].to_numpy(dtype=float), rtol=1e-10, atol=1e-12)
+        np.testing.assert_allclose(result['q'].to_numpy(), expected['q'].to_numpy(dtype=float), rtol=1e-10, atol=1e-12)
+        np.testing.assert_array_equal(result['lag'].to_numpy(), expected['lag'].to_numpy())
@@ -0,0 +1,37 @@
+# NOTE: Aligned return panel vs per-pair align_series copies
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import synthetic_prices
+
+from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+
+def ragged_prices(seed=0):
+    '''Assets with different trading calendars and an exchange-local tz-aware Date column.'''
+    rng = np.random.default_rng(seed)
+    data = synthetic_prices(assets=3, length=200, seed=seed)
+    data = data[rng.random(len(data)) > 0.1].copy()
+    data['Date'] = data['Date'].dt.tz_localize('America/New_York') + pd.Timedelta(hours=9, minutes=30)
+    return data
+
+
+@pytest.mark.parametrize('window', [(None, None), ('2020-02-03', '2020-06-30')])
+def test_aligned_pair_matches_align_series(window):
+    start, end = window
+    pipeline = CQGramPipeline()
+    pipeline.load_data(ragged_prices())
+
+    for benchmark, candidate, group in pipeline.pair_schedule():
+        X = pipeline.data['benchmarks'][benchmark]['log_return'].dropna()
+        Y = pipeline.data[group][candidate]['log_return'].dropna()
+        Y_expected, X_expected = pipeline.align_series(Y, X, start=start, end=end)
+
+        Y_aligned, X_aligned, dates = pipeline.aligned_pair(candidate, benchmark, start=start, end=end)
+
+        np.testing.assert_array_equal(Y_aligned, Y_expected.to_numpy())
+        np.testing.assert_array_equal(X_aligned, X_expected.to_numpy())
+        assert [date.date() for date in dates] == list(Y_expected.index)
+
@@ -0,0 +1,103 @@
+# NOTE: Partitioned Parquet & SQLite result storage round-trips
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import TAUS, synthetic_prices
+
+pytest.importorskip('pyarrow')
+
+from Backend.Scripts.ETL.cqgram_engine import batched_CQBS, postprocess_CQBS
+from Backend.Scripts.ETL.cqgram_store import CQResultStore
+from Backend.Scripts.ETL.cqgram_storage import read_partitioned, read_sqlite, write_partitioned, write_sqlite
+
+KEY = ['index', 'asset', 'tau2', 'tau1', 'lag']
+
+
+def result_store(returns, pairs=(('A', 'B'), ('B', 'A'))):
+    x1, x2 = returns
+    store = CQResultStore()
+    for benchmark, candidate in pairs:
+        grid = batched_CQBS(x1, TAUS, x2, TAUS, k=2, n=20, rng=np.random.default_rng(0))
+        store.append_block(benchmark, candidate, TAUS, TAUS,
+                           postprocess_CQBS(grid, 2) | {'date_start' : '2020-01-01', 'date_end' : '2020-12-31'})
+    return store
+
+
+def normalised(frame, columns):
+    frame = frame[columns].copy()
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype) or frame[column].dtype == object or pd.api.types.is_string_dtype(frame[column]):
+            frame[column] = frame[column].astype(str)
+    return frame.sort_values(KEY).reset_index(drop=True)
+
+
+def test_parquet_round_trip(returns, tmp_path):
+    store = result_store(returns)
+    write_partitioned(store, tmp_path / 'cq', period='UA', phase='phase_I')
+
+    expected = store.to_pandas(categorical=False)
+    loaded = read_partitioned(tmp_path / 'cq')
+
+    partitions = {path.relative_to(tmp_path / 'cq').parts[:2] for path in (tmp_path / 'cq').rglob('*.parquet')}
+    assert partitions == {('period=UA', 'phase=phase_I')}
+    assert loaded['tau1'].dtype == np.float64
+    assert set(loaded['period'].astype(str)) == {'UA'} and set(loaded['phase'].astype(str)) == {'phase_I'}
+    pd.testing.assert_frame_equal(normalised(loaded, expected.columns), normalised(expected, expected.columns), check_dtype=False)
+
+
+def test_parquet_partitions_replace_and_filter(returns, tmp_path):
+    root = tmp_path / 'cq'
+    write_partitioned(result_store(returns), root, period='UA', phase='phase_I')
+    write_partitioned(result_store(returns), root, period='UA', phase='phase_II')
+
+    # NOTE: rewriting one window replaces its partitions only
+    write_partitioned(result_store(returns, pairs=(('A', 'B'),)), root, period='UA', phase='phase_I')
+
+    counts = read_partitioned(root).groupby('phase', observed=True).size()
+    assert counts['phase_I'] == len(TAUS) ** 2 * 2
+    assert counts['phase_II'] == 2 * len(TAUS) ** 2 * 2
+
+    subset = read_partitioned(root, columns=['cq', 'index', 'tau1'], phase='phase_II', tau1=[0.05, 0.95], index='B')
+    assert list(subset.columns) == ['cq', 'index', 'tau1']
+    assert set(subset['tau1']) == {0.05, 0.95} and set(subset['index'].astype(str)) == {'B'}
+
+
+def test_sqlite_round_trip(returns, tmp_path):
+    path = str(tmp_path / 'db' / 'cq.sqlite')
+    store = result_store(returns)
+    write_sqlite(store, path, period='UA', phase='phase_I')
+    write_sqlite(store, path, period='UA', phase='phase_II')
+
+    expected = store.to_pandas(categorical=False)
+    loaded = read_sqlite(path, phase='phase_II')
+
+    assert len(read_sqlite(path)) == 2 * len(expected)
+    loaded['H0_rejected'] = loaded['H0_rejected'].astype(bool)
+    loaded['stationarity_satisfied'] = loaded['stationarity_satisfied'].astype(bool)
+    pd.testing.assert_frame_equal(normalised(loaded, expected.columns), normalised(expected, expected.columns), check_dtype=False)
+
+    subset = read_sqlite(path, columns=['cq', 'tau2'], tau2=[0.5], asset='A')
+    assert list(subset.columns) == ['cq', 'tau2'] and set(subset['tau2']) == {0.5}
+
+
+def test_pipeline_save_and_load_results(tmp_path):
+    from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+    pipeline = CQGramPipeline()
+    pipeline.load_data(synthetic_prices(assets=3, length=200))
+    output = pipeline.compute_CQBS(tau1_list=TAUS, tau2_list=TAUS, max_lag=1, n=20, seed=0, verbose=False)
+    expected = output.to_pandas(categorical=False)
+
+    paths = [
+        pipeline.save_results(str(tmp_path / 'cq.csv'), index=False),
+        pipeline.save_results(str(tmp_path / 'cq'), output_format='parquet', period='COVID', phase='full_period'),
+        pipeline.save_results_to_db(str(tmp_path / 'cq.sqlite'), period='COVID', phase='full_period'),
+    ]
+    for path in paths:
+        loaded = CQGramPipeline.load_results(path, tau1=0.05)
+        for column in ['H0_rejected', 'stationarity_satisfied']:
+            loaded[column] = loaded[column].astype(bool)
+        subset = expected[expected['tau1'] == 0.05]
+        pd.testing.assert_frame_equal(normalised(loaded, expected.columns), normalised(subset, expected.columns), check_dtype=False)
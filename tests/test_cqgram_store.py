@@ -0,0 +1,119 @@
+# NOTE: Columnar result store vs the legacy dict-of-DataFrames output
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import TAUS
+from Backend.Scripts.ETL.cqgram_engine import CQBS_COLUMNS, batched_CQBS, frame_CQBS, postprocess_CQBS
+from Backend.Scripts.ETL.cqgram_store import CQResultStore
+
+
+def pair_store(returns, benchmark='A', candidate='B', max_lag=2):
+    x1, x2 = returns
+    grid = batched_CQBS(x1, TAUS, x2, TAUS, k=max_lag, n=20, rng=np.random.default_rng(0))
+    columns = postprocess_CQBS(grid, max_lag) | {'date_start' : '2020-01-01', 'date_end' : '2020-12-31'}
+
+    store = CQResultStore(capacity=4)
+    store.append_block(benchmark, candidate, TAUS, TAUS, columns)
+    return store, grid
+
+
+def test_mapping_matches_per_key_frames(returns):
+    store, grid = pair_store(returns)
+
+    assert len(store) == len(TAUS) ** 2
+    for i, tau2 in enumerate(TAUS):
+        for j, tau1 in enumerate(TAUS):
+            frame = store[('A', 'B', tau2, tau1)]
+            expected = frame_CQBS(grid, i, j)
+            np.testing.assert_array_equal(frame['q'], expected['q'])
+            np.testing.assert_array_equal(frame['H0_rejected'], np.abs(expected['q']) > expected['qc'])
+            np.testing.assert_array_equal(frame['cq'], np.where(frame['H0_rejected'], expected['cq'], 0.0))
+            assert list(frame.index) == [1, 2]
+            assert (frame['date_start'] == '2020-01-01').all()
+
+
+def test_flat_table_layout(returns):
+    store, _ = pair_store(returns)
+    table = store.to_pandas(categorical=False)
+
+    assert len(table) == len(TAUS) ** 2 * 2
+    assert set(CQBS_COLUMNS + ['H0_rejected', 'lag', 'max_lag', 'index', 'asset', 'tau1', 'tau2',
+                               'date_start', 'date_end', 'stationarity_satisfied']) == set(table.columns)
+    first = table.iloc[:2]
+    assert first['tau2'].tolist() == [TAUS[0]] * 2 and first['tau1'].tolist() == [TAUS[0]] * 2
+    assert first['lag'].tolist() == [1, 2]
+
+
+def test_merge_overwrites_keys_and_keeps_messages(returns):
+    store, _ = pair_store(returns)
+    replacement, _ = pair_store(returns[::-1])
+
+    store |= {('A', 'C', None, None) : 'Stationary test not satisfied'}
+    store |= replacement
+
+    assert store[('A', 'C', None, None)] == 'Stationary test not satisfied'
+    pd.testing.assert_frame_equal(store[('A', 'B', 0.5, 0.05)], replacement[('A', 'B', 0.5, 0.05)])
+
+    # NOTE: overwritten rows are dropped from the flat table
+    table = store.to_pandas(categorical=False)
+    pd.testing.assert_frame_equal(table, replacement.to_pandas(categorical=False))
+
+
+def test_legacy_frames_append(returns):
+    store, _ = pair_store(returns)
+    legacy = CQResultStore()
+    legacy |= {key: store[key] for key in store}
+
+    pd.testing.assert_frame_equal(legacy.to_pandas(categorical=False), store.to_pandas(categorical=False))
+
+
+def test_arrow_and_pickle_round_trip(returns):
+    pytest.importorskip('pyarrow')
+    store, _ = pair_store(returns)
+    store |= pair_store(returns, candidate='C')[0]
+    store |= pair_store(returns[::-1])[0]
+
+    expected = store.to_pandas(categorical=False)
+
+    arrow = store.to_arrow().to_pandas()
+    for column in ['index', 'asset', 'date_start', 'date_end']:
+        arrow[column] = arrow[column].astype(object)
+    pd.testing.assert_frame_equal(arrow, expected, check_dtype=False)
+
+    restored = pickle.loads(pickle.dumps(store))
+    assert list(restored) == list(store)
+    pd.testing.assert_frame_equal(restored.to_pandas(categorical=False), expected)
+
+
+def test_create_dataframe_matches_legacy_dict(returns):
+    from Backend.Scripts.ETL.cqgram_etl import CQGramPipeline
+
+    store, _ = pair_store(returns)
+    legacy = CQGramPipeline.create_dataframe_from_cqgram({key: store[key] for key in store})
+    columnar = CQGramPipeline.create_dataframe_from_cqgram(store)
+
+    # NOTE: same rows & values; labels are categoricals in the columnar table
+    pd.testing.assert_frame_equal(columnar[legacy.columns].astype(object), legacy.astype(object))
+
+
+def test_records_match_per_key_frames(returns):
+    store, _ = pair_store(returns)
+    store |= {('A', 'C', None, None) : 'Stationary test not satisfied'}
+    store |= pair_store(returns[::-1])[0]
+
+    records = dict(store.records())
+    assert list(records) == list(store)
+    for key in store:
+        expected = store[key]
+        assert records[key] == (expected if isinstance(expected, str) else expected.to_dict('records'))
+
+    # NOTE: missing=None -> JSON nulls instead of NaN
+    key = ('A', 'B', 0.5, 0.05)
+    start, _ = store.keys_map[key]
+    store.columns['cq_upper'][start] = np.nan
+    assert dict(store.records(missing=None))[key][0]['cq_upper'] is None
+    assert np.isnan(dict(store.records())[key][0]['cq_upper'])
@@ -0,0 +1,40 @@
+# NOTE: In-process job queue: status of finished, raising & failure-payload runs
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'API'))
+
+from jobs import JobManager
+
+
+def run(request, progress=None):
+    if request == 'raise':
+        raise RuntimeError('boom')
+    if request == 'fail':
+        return {'status' : 'fail', 'echo' : 'Run failed at exception: bad'}
+    progress(1, 1)
+    return {'status' : 'ok', 'result' : request}
+
+
+def wait(manager, job, timeout=5.0):
+    deadline = time.time() + timeout
+    while job.finished is None and time.time() < deadline:
+        time.sleep(0.01)
+    return manager.get(job.id)
+
+
+def test_job_statuses():
+    manager = JobManager(run, workers=1)
+
+    ok = wait(manager, manager.submit('data'))
+    assert ok.status == 'done' and ok.result == {'status' : 'ok', 'result' : 'data'} and ok.error is None
+    assert ok.summary()['progress'] == {'done' : 1, 'total' : 1}
+
+    raised = wait(manager, manager.submit('raise'))
+    assert raised.status == 'failed' and raised.error == 'boom'
+
+    failed = wait(manager, manager.submit('fail'))
+    assert failed.status == 'failed' and failed.result is None
+    assert failed.error == 'Run failed at exception: bad'
@@ -0,0 +1,64 @@
+# NOTE: Incremental rolling Cross-Quantilogram vs brute-force recomputation of every window
+
+import numpy as np
+import pytest
+
+from conftest import TAUS, synthetic_returns
+from Backend.Scripts.ETL.cqgram_engine import (
+    BootstrapPlan, bootstrap_statistics, cross_quantilogram, portmanteau, quantile_hits, rolling_CQBS,
+)
+
+
+def window_cq(x1, x2, end, window, max_lag):
+    s = end - window + 1
+    return cross_quantilogram(quantile_hits(x1[s:end + 1], TAUS), quantile_hits(x2[s:end + 1], TAUS), max_lag)[0]
+
+
+@pytest.mark.parametrize('step', [1, 7])
+@pytest.mark.parametrize('decimals', [None, 3])
+def test_rolling_matches_recomputed_windows(step, decimals):
+    x1, x2 = synthetic_returns(260, seed=5)
+    if decimals is not None:
+        # NOTE: rounded returns -> tied observations at the moving quantiles
+        x1, x2 = np.round(x1, decimals), np.round(x2, decimals)
+
+    window, max_lag = 60, 3
+    output = rolling_CQBS(x1, TAUS, x2, TAUS, window, max_lag=max_lag, step=step)
+
+    np.testing.assert_array_equal(output['end'], np.arange(window - 1, len(x1), step))
+    for e, end in enumerate(output['end']):
+        expected = window_cq(x1, x2, end, window, max_lag)
+        np.testing.assert_allclose(output['cq'][e], expected, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(output['q'][e], portmanteau(expected, window), rtol=1e-9, atol=1e-9)
+
+
+def test_rolling_chi2_critical_values():
+    from scipy.stats import chi2
+
+    x1, x2 = synthetic_returns(120, seed=2)
+    output = rolling_CQBS(x1, TAUS, x2, TAUS, 50, max_lag=2, step=10)
+
+    np.testing.assert_allclose(output['qc'][..., 0], chi2.ppf(0.95, 1))
+    np.testing.assert_allclose(output['qc'][..., 1], chi2.ppf(0.95, 2))
+    assert np.isnan(output['cq_upper']).all() and np.isnan(output['cq_lower']).all()
+
+
+def test_rolling_bootstrap_matches_recomputed_windows():
+    x1, x2 = synthetic_returns(150, seed=3)
+    window, plan = 80, BootstrapPlan(n=30, seed=1)
+    output = rolling_CQBS(x1, TAUS, x2, TAUS, window, max_lag=2, step=35, bootstrap_plan=plan)
+
+    for e, end in enumerate(output['end']):
+        s = end - window + 1
+        cq = window_cq(x1, x2, end, window, 2)
+        stats = bootstrap_statistics(x1[s:end + 1], TAUS, x2[s:end + 1], TAUS, cq, plan.indices(window))
+        for column, values in stats.items():
+            np.testing.assert_allclose(output[column][e], values, rtol=1e-9, atol=1e-12)
+
+
+def test_rolling_rejects_invalid_window():
+    x1, x2 = synthetic_returns(30)
+    with pytest.raises(ValueError):
+        rolling_CQBS(x1, TAUS, x2, TAUS, 31)
+    with pytest.raises(ValueError):
+        rolling_CQBS(x1, TAUS, x2, TAUS, 3, max_lag=3)
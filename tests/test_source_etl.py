@@ -0,0 +1,79 @@
+# NOTE: Concurrent fetch_adjusted_data on the offline Local source
+
+import threading
+
+import pandas as pd
+
+from conftest import synthetic_prices
+
+from Backend.Scripts.ETL.source_etl import Local
+
+
+def local_frames(assets=4):
+    data = synthetic_prices(assets=assets, length=60)
+    return {ticker: frame.drop(columns='ticker').set_index('Date') for ticker, frame in data.groupby('ticker')}
+
+
+class CountingLocal(Local):
+    '''Local source recording the peak number of concurrent downloads.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def download(self, ticker, start=None, end=None, period='max'):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return super().download(ticker, start=start, end=end, period=period)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_concurrent_fetch_matches_serial():
+    frames = local_frames()
+    mapping = {f'Name {i}' : ticker for i, ticker in enumerate(reversed(list(frames)))}
+
+    serial = Local(mapping, frames).fetch_adjusted_data(start='2020-01-10', end='2020-03-01', workers=1)
+
+    source = CountingLocal(mapping, frames, latency=0.05)
+    concurrent = source.fetch_adjusted_data(start='2020-01-10', end='2020-03-01', workers=4)
+
+    pd.testing.assert_frame_equal(concurrent, serial)
+    assert list(pd.unique(concurrent['ticker'])) == list(mapping)
+    assert source.peak > 1 and source.errors == {}
+
+
+def test_failed_tickers_are_reported_not_raised():
+    frames = local_frames(assets=2)
+    mapping = {'first' : 'Asset 0', 'missing' : 'NOPE', 'second' : 'Asset 1'}
+
+    source = Local(mapping, frames)
+    data = source.fetch_adjusted_data(workers=3, retries=1, backoff=0.0)
+
+    assert list(pd.unique(data['ticker'])) == ['first', 'second']
+    assert list(source.errors) == ['missing']
+
+
+def test_retry_recovers_transient_failures():
+    frames = local_frames(assets=1)
+    source = Local({'only' : 'Asset 0'}, frames)
+
+    calls = []
+    download = source.download
+
+    def flaky(ticker, start=None, end=None, period='max'):
+        calls.append(ticker)
+        if len(calls) == 1:
+            raise ConnectionError('transient')
+        return download(ticker, start=start, end=end, period=period)
+
+    source.download = flaky
+    data = source.fetch_adjusted_data(retries=2, backoff=0.0)
+
+    assert len(calls) == 2 and source.errors == {}
+    assert len(data) == len(frames['Asset 0'])
@@ -0,0 +1,46 @@
+# NOTE: Density cube vs grouped counts on the flat result table
+
+import numpy as np
+import pandas as pd
+
+from Backend.Scripts.spillover import classify_spillover
+from Backend.Scripts.topology import DensityCube
+
+
+def result_table(seed=0, assets=5):
+    rng = np.random.default_rng(seed)
+    taus = [0.05, 0.5, 0.95]
+    rows = [(period, phase, f'A{i}', f'A{j}', tau1, tau2)
+            for period in ['UA', 'COVID'] for phase in ['full_period', 'phase_I']
+            for i in range(assets) for j in range(assets) if i != j
+            for tau1 in taus for tau2 in taus]
+    data = pd.DataFrame(rows, columns=['period', 'phase', 'index', 'asset', 'tau1', 'tau2'])
+    data['cq'] = rng.uniform(-0.3, 0.3, len(data))
+    data['H0_rejected'] = rng.random(len(data)) < 0.4
+    return data
+
+
+def test_edge_counts_match_groupby():
+    data = result_table()
+    data['spillover'] = classify_spillover(data)
+    cube = DensityCube(data)
+
+    by = ['period', 'phase', 'spillover']
+    subset = data[data['H0_rejected'] & (data['tau1'] == 0.05) & data['tau2'].isin([0.05, 0.95])]
+    expected = subset.groupby(by).size()
+
+    counts = cube.edge_counts(by, tau1=(0.05,), tau2=(0.05, 0.95))
+    pd.testing.assert_series_equal(counts.sort_index(), expected.sort_index(), check_names=False, check_dtype=False)
+
+
+def test_cube_reflects_the_frame_it_was_built_from():
+    data = result_table()
+    before = DensityCube(data)
+
+    # NOTE: enrich & edit after the first cube -> a cube built afterwards sees the changes
+    data['spillover'] = classify_spillover(data)
+    data['H0_rejected'] = False
+    after = DensityCube(data)
+
+    assert before.edge_counts(['period', 'phase']).sum() > 0
+    assert after.edge_counts(['period', 'phase', 'spillover']).sum() == 0